@@ -0,0 +1,80 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Cold start: compares reading and parsing a stylesheet against loading
+# it from the compiled on-disk cache.
+
+# Usage:
+# python benchmarks/cache_benchmark.py
+
+
+import os
+import sys
+import tempfile
+import time
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from uistylelang.cache import EnableCompiledCache, DisableCompiledCache
+from uistylelang.registry import StyleSheetRegistry
+
+
+RULE_COUNTS = [100, 1000, 10000, 50000]
+
+
+def GenerateStyleSheet(rule_count):
+    """ Generates a stylesheet with ``rule_count`` @style blocks. """
+    rules = []
+    for i in range(rule_count):
+        pseudo = ["", ":hover", ":press"][i % 3]
+        rules.append(
+            "/* element {0} */\n"
+            "@style elem-{1}{2} {{\n"
+            "  background-color: #F4F4F4;\n"
+            "  border-color: red;\n"
+            "  border-width: {3}px;\n"
+            "  top: {0}px;\n"
+            "  left: 1.5px;\n"
+            "  transform-rotate: 10deg;\n"
+            "}}\n".format(i, "".join(chr(97 + int(d)) for d in str(i // 3)), pseudo, i % 7)
+            )
+    return "\n".join(rules)
+
+
+def TimeLoad(path, repeat=3):
+    """ Best time of loading the stylesheet in a fresh registry (i.e: a cold start). """
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        stylesheet = StyleSheetRegistry().GetStyleSheet(path)
+        best = min(best, time.perf_counter() - start)
+    return best, stylesheet
+
+
+def Main():
+    print("{:>8}  {:>12}  {:>12}  {:>8}".format("rules", "parse (s)", "cache (s)", "speedup"))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for rule_count in RULE_COUNTS:
+            path = os.path.join(temp_dir, "styles-{}.uiss".format(rule_count))
+            with open(path, "w") as stylesheet_file:
+                stylesheet_file.write(GenerateStyleSheet(rule_count))
+
+            DisableCompiledCache()
+            parse_time, parsed = TimeLoad(path)
+
+            # Write the cache, then time loading from it
+            EnableCompiledCache(os.path.join(temp_dir, "cache"))
+            StyleSheetRegistry().GetStyleSheet(path)
+            cache_time, cached = TimeLoad(path)
+            DisableCompiledCache()
+
+            assert parsed.ParsedStyles == cached.ParsedStyles, "Cached styles differ!"
+
+            print("{:>8}  {:>12.5f}  {:>12.5f}  {:>7.2f}x".format(
+                rule_count, parse_time, cache_time, parse_time / cache_time))
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,97 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# High-frequency element updates: compares ``UIStylePDC.UpdateElem`` with
+# an id statement string against ``UIStylePDC.Update`` with a handle from
+# ``UIStylePDC.GetHandle``, for updates which don't need a redraw (e.g: on
+# every mouse motion event). Also counts the memory allocated by them.
+
+# Usage:
+# python benchmarks/handle_benchmark.py
+
+
+import os
+import sys
+import time
+import tracemalloc
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import wx
+
+from uistylelang import UIStylePDC
+
+
+UPDATE_COUNT = 200000
+
+STYLESHEET = """/* !uistylelangstr */
+@style button {
+  background-color: #F4F4F4;
+  top: 20px;
+  left: 40px;
+  width: 115px;
+  height: 35px;
+}
+
+@style button:hover {
+  background-color: #FDFDFD;
+  top: 20px;
+  left: 40px;
+  width: 115px;
+  height: 35px;
+}
+"""
+
+
+def TimeIt(func, repeat=3):
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def AllocatedBlocks(func):
+    """ Returns the number of memory blocks still allocated after ``func``, and the peak. """
+    tracemalloc.start()
+    func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+
+def Main():
+    app = wx.App()
+    frame = wx.Frame(None)
+    pdc = UIStylePDC(frame, STYLESHEET)
+    pdc.InitElem("button:hover")
+
+    handle = pdc.GetHandle("button:hover")
+
+    def UpdateString():
+        for i in range(UPDATE_COUNT):
+            pdc.UpdateElem("button:hover")
+
+    def UpdateHandle():
+        for i in range(UPDATE_COUNT):
+            pdc.Update(handle)
+
+    string_time = TimeIt(UpdateString)
+    handle_time = TimeIt(UpdateHandle)
+    string_memory = AllocatedBlocks(UpdateString)
+    handle_memory = AllocatedBlocks(UpdateHandle)
+
+    print("{:,} updates without a redraw".format(UPDATE_COUNT))
+    print("  UpdateElem(str):  {:.3f}s ({:.0f} ns/update), peak {:,} bytes".format(
+        string_time, string_time / UPDATE_COUNT * 1e9, string_memory[1]))
+    print("  Update(handle):   {:.3f}s ({:.0f} ns/update), peak {:,} bytes".format(
+        handle_time, handle_time / UPDATE_COUNT * 1e9, handle_memory[1]))
+    print("  speedup: {:.1f}x".format(string_time / handle_time))
+
+    frame.Destroy()
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,77 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Small edits to a large stylesheet: compares parsing the whole edited
+# stylesheet again against ``UIStyleLangParser.parse_incremental``, which
+# only re-tokenizes the @style blocks whose text changed. Also times two
+# edits far apart, where the blocks in between are reused by their hash.
+
+# Usage:
+# python benchmarks/incremental_benchmark.py
+
+
+import os
+import sys
+import time
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from uistylelang.lang import UIStyleLangParser
+
+from parser_benchmark import GenerateStyleSheet
+
+
+RULE_COUNTS = [1000, 10000, 50000]
+
+
+def Main():
+    print("{:>8}  {:>12}  {:>14}  {:>8}".format(
+        "rules", "full (s)", "incremental (s)", "speedup"))
+
+    for rule_count in RULE_COUNTS:
+        text = GenerateStyleSheet(rule_count)
+        # Change a single property in the middle of the stylesheet
+        middle = text.index("border-color: red;", len(text) // 2)
+        edited = text[:middle] + "border-color: blue;" + text[middle + len("border-color: red;"):]
+
+        start = time.perf_counter()
+        full = UIStyleLangParser(edited).parse()
+        full_time = time.perf_counter() - start
+
+        parser = UIStyleLangParser(text)
+        parser.get_block_index()
+        start = time.perf_counter()
+        parsed, changed = parser.parse_incremental(edited)
+        incremental_time = time.perf_counter() - start
+
+        assert parsed == full, "Incremental output differs!"
+        assert len(changed) == 1
+
+        print("{:>8}  {:>12.5f}  {:>14.5f}  {:>7.2f}x".format(
+            rule_count, full_time, incremental_time, full_time / incremental_time))
+
+        # Change a property near the start and near the end as well
+        first = edited.index("border-color: red;")
+        last = edited.rindex("border-color: red;")
+        edited_apart = (edited[:first] + "border-color: blue;" 
+                        + edited[first + len("border-color: red;"):last] + "border-color: blue;" 
+                        + edited[last + len("border-color: red;"):])
+
+        start = time.perf_counter()
+        full = UIStyleLangParser(edited_apart).parse()
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed, changed = parser.parse_incremental(edited_apart)
+        incremental_time = time.perf_counter() - start
+
+        assert parsed == full, "Incremental output differs!"
+        assert len(changed) == 2
+
+        print("{:>8}  {:>12.5f}  {:>14.5f}  {:>7.2f}x  (edits far apart)".format(
+            rule_count, full_time, incremental_time, full_time / incremental_time))
+
+
+if __name__ == "__main__":
+    Main()
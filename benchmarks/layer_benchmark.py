@@ -0,0 +1,104 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Painting expensive elements: compares replaying the PDC with
+# ``DrawToDCClipped`` (as on every paint) when rotated text and rounded
+# rects with borders are rasterized each time, against drawing them in
+# retained mode with ``UIStylePDC.SetCacheHint`` (one bitmap each).
+
+# Usage:
+# python benchmarks/layer_benchmark.py
+
+
+import os
+import sys
+import time
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import wx
+
+from uistylelang import UIStylePDC
+
+
+ELEMENT_COUNT = 200
+PAINT_COUNT = 100
+SIZE = (1200, 900)
+
+
+def GenerateStyleSheet(element_count):
+    """ Generates a stylesheet with a rotated label and a rounded rect for each element. """
+    rules = ["/* !uistylelangstr */"]
+    for i in range(element_count):
+        elem_id = "".join(chr(97 + int(d)) for d in str(i))
+        top = (i // 10) * 40
+        left = (i % 10) * 110
+        rules.append(
+            "@style box-{0} {{\n"
+            "  background-color: #F4F4F4;\n"
+            "  border-color: #444;\n"
+            "  border-width: 2px;\n"
+            "  border-radius: 8px;\n"
+            "  top: {1}px;\n"
+            "  left: {2}px;\n"
+            "  width: 100px;\n"
+            "  height: 35px;\n"
+            "}}\n"
+            "@style label-{0} {{\n"
+            "  color: black;\n"
+            "  top: {3}px;\n"
+            "  left: {4}px;\n"
+            "  transform-rotate: 10deg;\n"
+            "  font-weight: bold;\n"
+            "}}".format(elem_id, top, left, top + 25, left + 10)
+            )
+    return "\n".join(rules)
+
+
+def CreatePDC(frame, stylesheet, element_count, cache):
+    pdc = UIStylePDC(frame, stylesheet)
+    for i in range(element_count):
+        elem_id = "".join(chr(97 + int(d)) for d in str(i))
+        pdc.SetCacheHint("box-" + elem_id, cache)
+        pdc.SetCacheHint("label-" + elem_id, cache)
+        pdc.InitElem("box-" + elem_id)
+        pdc.InitElem("label-" + elem_id, "TEXT", "Label {}".format(i))
+    return pdc
+
+
+def TimePaint(pdc, bitmap):
+    dc = wx.MemoryDC(bitmap)
+    start = time.perf_counter()
+    for i in range(PAINT_COUNT):
+        pdc.DrawToDCClipped(dc, wx.Rect(0, 0, *SIZE))
+    elapsed = time.perf_counter() - start
+    dc.SelectObject(wx.NullBitmap)
+    return elapsed
+
+
+def Main():
+    app = wx.App()
+    frame = wx.Frame(None)
+    bitmap = wx.Bitmap(*SIZE)
+    stylesheet = GenerateStyleSheet(ELEMENT_COUNT)
+
+    direct = TimePaint(CreatePDC(frame, stylesheet, ELEMENT_COUNT, False), bitmap)
+
+    start = time.perf_counter()
+    pdc = CreatePDC(frame, stylesheet, ELEMENT_COUNT, True)
+    render = time.perf_counter() - start
+    retained = TimePaint(pdc, bitmap)
+
+    print("{:,} paints of {:,} labels and boxes".format(PAINT_COUNT, ELEMENT_COUNT))
+    print("  rasterized:  {:.3f}s ({:.2f} ms/paint)".format(direct, direct / PAINT_COUNT * 1e3))
+    print("  retained:    {:.3f}s ({:.2f} ms/paint)".format(retained, retained / PAINT_COUNT * 1e3))
+    print("  speedup:     {:.1f}x".format(direct / retained))
+    print("  rendering the layers: {:.3f}s, {:,} bytes".format(
+        render, pdc.Layers.GetStats()["bytes"]))
+
+    frame.Destroy()
+
+
+if __name__ == "__main__":
+    Main()
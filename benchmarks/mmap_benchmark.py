@@ -0,0 +1,86 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Peak RSS and time of parsing a 50 MB stylesheet file: compares reading
+# the file with ``ReadRawFile`` and parsing the text against parsing the
+# memory-mapped bytes with ``UIStyleLangParser.parse_file``. Each is run in
+# a process of its own, so that the peak RSS of one doesn't hide the other.
+
+# Usage:
+# python benchmarks/mmap_benchmark.py
+
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from uistylelang.lang import UIStyleLangParser
+from uistylelang.utils import ReadRawFile
+
+from parser_benchmark import GenerateStyleSheet
+
+
+FILE_SIZE = 50 * 1000 * 1000
+
+
+def ParseText(path):
+    return UIStyleLangParser(ReadRawFile(path)).parse()
+
+
+def ParseMapped(path):
+    return UIStyleLangParser("").parse_file(path)
+
+
+def RunMode(mode, path):
+    """ Parses the file in this process and prints the time and peak RSS (in KB). """
+    parse = {"text": ParseText, "mmap": ParseMapped}[mode]
+
+    start = time.perf_counter()
+    parsed_styles = parse(path)
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(elapsed, peak_rss, len(parsed_styles))
+
+
+def Measure(mode, path):
+    output = subprocess.check_output(
+        [sys.executable, __file__, mode, path], 
+        cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+    elapsed, peak_rss, count = output.split()
+    return float(elapsed), int(peak_rss), int(count)
+
+
+def Main():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "styles.uiss")
+
+        # About 175 bytes per rule
+        text = GenerateStyleSheet(FILE_SIZE // 175)
+        with open(path, "w") as stylesheet_file:
+            stylesheet_file.write(text)
+        del text
+
+        size = os.path.getsize(path)
+        text_time, text_rss, text_count = Measure("text", path)
+        mmap_time, mmap_rss, mmap_count = Measure("mmap", path)
+
+    assert text_count == mmap_count
+
+    print("{:.1f} MB stylesheet".format(size / 1e6))
+    print("  read + parse: {:.3f}s, {:>10,} KB peak RSS".format(text_time, text_rss))
+    print("  mmap + parse: {:.3f}s, {:>10,} KB peak RSS".format(mmap_time, mmap_rss))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        RunMode(sys.argv[1], sys.argv[2])
+    else:
+        Main()
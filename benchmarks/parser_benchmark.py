@@ -0,0 +1,153 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Parser throughput: compares the single-pass tokenizer used by
+# ``UIStyleLangParser.parse`` against the previous implementation, which
+# removed comments in a separate pass and rebuilt its regex on every call.
+
+# Usage:
+# python benchmarks/parser_benchmark.py
+
+
+import os
+import re
+import sys
+import time
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from uistylelang.lang import UIStyleLangParser
+
+
+RULE_COUNTS = [10, 100, 1000, 10000, 100000]
+
+
+def GenerateStyleSheet(rule_count):
+    """ Generates a stylesheet with ``rule_count`` @style blocks. """
+    rules = []
+    for i in range(rule_count):
+        pseudo = ["", ":hover", ":press"][i % 3]
+        rules.append(
+            "/* element {0} */\n"
+            "@style elem-{1}{2} {{\n"
+            "  background-color: #F4F4F4;\n"
+            "  border-color: red;\n"
+            "  border-width: {3}px;\n"
+            "  top: {0}px;\n"
+            "  left: 1.5px;\n"
+            "  transform-rotate: 10deg;\n"
+            "}}\n".format(i, "".join(chr(97 + int(d)) for d in str(i // 3)), pseudo, i % 7)
+            )
+    return "\n".join(rules)
+
+
+def LegacyParse(uiss_text):
+    """ The previous ``UIStyleLangParser.parse`` (non-inline path), kept
+    here as the baseline and to check that the output is identical.
+    """
+    parsed_data = {}
+    uiss_styles = re.compile(r'/\*.*?\*/').sub('', uiss_text)
+
+    token_specification = [
+        ('ID', r'@style [A-Za-z\-:]+'),
+        ('BEGIN', r'{'),
+        ('PROPERTY', r'[A-Za-z0-9\-]+'),
+        ('VALUE', r': [A-Za-z0-9#\.\-]+;'),
+        ('END', r'}'),
+        ('NEWLINE', r'\n'),
+        ('SKIP', r'[ \t]+'),
+        ('MISMATCH', r'.'),
+    ]
+    tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
+    last_id = None
+    new_block = True
+
+    for mo in re.finditer(tok_regex, uiss_styles):
+        kind = mo.lastgroup
+        value = mo.group()
+
+        if kind in ("NEWLINE", "SKIP", "BEGIN"):
+            continue
+        elif kind == "MISMATCH":
+            raise RuntimeError(f'{value!r} unexpected')
+        elif kind == "ID":
+            style_id_statement = value[7:]
+            if style_id_statement.rfind(":") == -1:
+                style_id = style_id_statement
+                style_pseudo_id = "init"
+            else:
+                style_ids = style_id_statement.rsplit(":")
+                style_id = style_ids[0]
+                style_pseudo_id = style_ids[1]
+            current_block = [style_id, style_pseudo_id]
+            if style_id != last_id:
+                new_block = True
+            if new_block == True:
+                new_block = False
+                last_id = style_id
+                parsed_data[style_id] = {}
+            prop_dict = {}
+        elif kind == "PROPERTY":
+            property_selector = value
+            prop_dict[str(property_selector)] = None
+        elif kind == "VALUE":
+            prop_dict[str(property_selector)] = value[2:][:-1]
+        elif kind == "END":
+            parsed_data[current_block[0]][current_block[1]] = prop_dict
+
+    return parsed_data
+
+
+# Stylesheets with comments (including comments touching the tokens, which 
+# are removed before tokenizing, as before) and blocks which are never 
+# closed. Each one must give the same output as the legacy parser.
+COMMENT_CASES = [
+    "@style a { /* x */ color: red; }",
+    "/* a */ @style a { color: red; /* b */ }\n@style a:hover {\n /* c */ top: 1px;\n}",
+    "@style a { color: red; } /* } */",
+    "@style a { color: red;/* x */top: 1px; }",
+    "@style a { col/* x */or: red; }",
+    "@style a/* x */:hover { color: red; }",
+    "@style a { color:/* x */ red; }",
+    "@style x",
+    "@style a { color: red; }\n@style b {\n@style a:hover { top: 1px; }",
+]
+
+
+def CheckComments():
+    for text in COMMENT_CASES:
+        assert UIStyleLangParser(text).parse() == LegacyParse(text), "Parser output differs for {!r}!".format(text)
+
+
+def TimeIt(func, repeat):
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def Main():
+    CheckComments()
+
+    print("{:>8}  {:>12}  {:>12}  {:>8}  {:>14}".format(
+        "rules", "legacy (s)", "current (s)", "speedup", "rules/s"))
+
+    for rule_count in RULE_COUNTS:
+        text = GenerateStyleSheet(rule_count)
+        parser = UIStyleLangParser(text)
+
+        assert parser.parse() == LegacyParse(text), "Parser output differs!"
+
+        repeat = 5 if rule_count < 100000 else 2
+        legacy = TimeIt(lambda: LegacyParse(text), repeat)
+        current = TimeIt(parser.parse, repeat)
+
+        print("{:>8}  {:>12.5f}  {:>12.5f}  {:>7.2f}x  {:>14,.0f}".format(
+            rule_count, legacy, current, legacy / current, rule_count / current))
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,90 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Peak memory of tokenizing a large stylesheet file: compares reading the
+# whole file and tokenizing it with ``UIStyleLangParser.iter_blocks``
+# against streaming it from the file with ``UIStyleLangParser.iter_stream``.
+
+# Usage:
+# python benchmarks/stream_benchmark.py
+
+
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from uistylelang.lang import UIStyleLangParser
+from uistylelang.utils import ReadRawFile
+
+from parser_benchmark import GenerateStyleSheet, COMMENT_CASES
+
+
+RULE_COUNT = 100000
+
+# Closing braces and comment delimiters inside of comments, which a chunk 
+# can end in the middle of
+STREAM_CASES = COMMENT_CASES + [
+    "@style a {\n  color: red; /* was: } /* old */\n}\n",
+    "@style a { color: red; /* } */ } /* } /* } */ @style b { top: 1px; }\n",
+    GenerateStyleSheet(30),
+]
+
+
+def CheckChunks():
+    """ Checks that streaming each case in chunks of any size gives the same output as ``parse``. """
+    for text in STREAM_CASES:
+        expected = UIStyleLangParser(text).parse()
+        for chunk_size in range(1, min(len(text), 256) + 1):
+            parsed_data = UIStyleLangParser("").parse_stream(io.StringIO(text), chunk_size)
+            assert parsed_data == expected, "Stream output differs for {!r} in chunks of {}!".format(text, chunk_size)
+
+
+def CountWholeFile(path):
+    parser = UIStyleLangParser("")
+    return sum(1 for block in parser.iter_blocks(ReadRawFile(path)))
+
+
+def CountStream(path):
+    parser = UIStyleLangParser("")
+    with open(path, "r") as stylesheet_file:
+        return sum(1 for block in parser.iter_stream(stylesheet_file))
+
+
+def Measure(func, path):
+    """ Returns the peak bytes allocated and the time taken by ``func``. """
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert count == RULE_COUNT
+    return peak, elapsed
+
+
+def Main():
+    CheckChunks()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "styles.uiss")
+        with open(path, "w") as stylesheet_file:
+            stylesheet_file.write(GenerateStyleSheet(RULE_COUNT))
+
+        size = os.path.getsize(path)
+        whole_peak, whole_time = Measure(CountWholeFile, path)
+        stream_peak, stream_time = Measure(CountStream, path)
+
+    print("{:,} rules ({:.1f} MB)".format(RULE_COUNT, size / 1e6))
+    print("  whole file: {:>12,} bytes peak, {:.3f}s".format(whole_peak, whole_time))
+    print("  streamed:   {:>12,} bytes peak, {:.3f}s".format(stream_peak, stream_time))
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,134 @@
+# Benchmark for UI Style Lang
+# ===========================
+
+# Startup time of a window with 1,000 styled widgets: compares the cached
+# ``UIStyleApp.ParsedStyles`` against parsing the stylesheet again for
+# every widget, as it was done before.
+
+# Restyling a window of 2,000 styled widgets: compares calling
+# ``ConfigureStyle`` and refreshing each widget against a single
+# ``UIStyleApp.ApplyStylesheet`` (one Freeze/Thaw and one repaint).
+
+# Usage:
+# python benchmarks/widgets_benchmark.py
+
+
+import os
+import sys
+import time
+
+# Import the package of this repository, rather than an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import wx
+
+from uistylelang import UIStyleApp, UIStyleFrame, UIStylePanel, UIStyleStaticText
+
+
+WIDGET_COUNT = 1000
+RESTYLE_WIDGET_COUNT = 2000
+
+
+def GenerateStyleSheet(widget_count):
+    """ Generates a stylesheet with the frame, panel and a rule for each static text. """
+    rules = [
+        "/* !uistylelangstr */",
+        "@style main-frame {\n  background-color: #ECECEC;\n}",
+        "@style main-panel {\n  background-color: #444;\n}",
+    ]
+    for i in range(widget_count):
+        rules.append(
+            "@style text-{0} {{\n  background-color: #444;\n  color: white;\n}}".format(
+                "".join(chr(97 + int(d)) for d in str(i))
+                )
+            )
+    return "\n".join(rules)
+
+
+class BenchmarkApp(UIStyleApp):
+    """ Parses the stylesheet on every ``ParsedStyles`` access, like 
+    before, unless ``cached`` is set. 
+    """
+    cached = False
+
+    @property
+    def ParsedStyles(self):
+        if self.cached == True:
+            return UIStyleApp.ParsedStyles.fget(self)
+        return self.lang_parser.parse()
+
+
+def CreateWidgets(widget_count):
+    frame = UIStyleFrame(None, name="main-frame")
+    panel = UIStylePanel(frame, name="main-panel")
+    for i in range(widget_count):
+        UIStyleStaticText(
+            panel, label="Text", name="text-" + "".join(chr(97 + int(d)) for d in str(i))
+            )
+    return frame
+
+
+def BuildWindow(widget_count):
+    start = time.perf_counter()
+    frame = CreateWidgets(widget_count)
+    elapsed = time.perf_counter() - start
+    frame.Destroy()
+    return elapsed
+
+
+def RestyleEachWidget(app, frame):
+    """ Restyle the widgets one by one, like before ``ApplyStylesheet``. """
+    windows = [frame]
+    while windows:
+        window = windows.pop()
+        windows.extend(window.GetChildren())
+        window.ConfigureStyle()
+        window.Refresh()
+    frame.Update()
+
+
+def RestyleApplyStylesheet(app, frame):
+    app.ApplyStylesheet(frame)
+    frame.Update()
+
+
+def TimeRestyle(app, restyle, widget_count):
+    frame = CreateWidgets(widget_count)
+    frame.Show()
+    wx.SafeYield()
+
+    start = time.perf_counter()
+    restyle(app, frame)
+    wx.SafeYield()
+    elapsed = time.perf_counter() - start
+
+    frame.Destroy()
+    return elapsed
+
+
+def Main():
+    stylesheet = GenerateStyleSheet(WIDGET_COUNT)
+
+    app = BenchmarkApp(stylesheet)
+    uncached = BuildWindow(WIDGET_COUNT)
+
+    app.cached = True
+    cached = BuildWindow(WIDGET_COUNT)
+
+    print("{:,} styled widgets".format(WIDGET_COUNT))
+    print("  parsed per widget: {:.3f}s".format(uncached))
+    print("  cached:            {:.3f}s".format(cached))
+    print("  speedup:           {:.1f}x".format(uncached / cached))
+
+    app.SetStyleSheet(GenerateStyleSheet(RESTYLE_WIDGET_COUNT))
+    each = TimeRestyle(app, RestyleEachWidget, RESTYLE_WIDGET_COUNT)
+    applied = TimeRestyle(app, RestyleApplyStylesheet, RESTYLE_WIDGET_COUNT)
+
+    print("{:,} styled widgets restyled".format(RESTYLE_WIDGET_COUNT))
+    print("  each widget:       {:.3f}s".format(each))
+    print("  ApplyStylesheet:   {:.3f}s".format(applied))
+    print("  speedup:           {:.1f}x".format(each / applied))
+
+
+if __name__ == "__main__":
+    Main()
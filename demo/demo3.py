@@ -47,40 +47,35 @@ class MainApplication(UIStyleFrame):
 
     def OnMotion(self, event):
         pnt = event.GetPosition()
-        elem_rect = self._pdc.GetWxRect('button')
-        mouse_pnt = wx.Rect(pnt[0], pnt[1], 1, 1)
         
-        if mouse_pnt.Intersects(elem_rect) == True:
-            self._pdc.UpdateElem('button:hover')
+        if 'button' in self._pdc.HitTest(pnt):
+            changed = self._pdc.UpdateElem('button:hover')
         else:
-            self._pdc.UpdateElem('button')
+            changed = self._pdc.UpdateElem('button')
 
-        self.RefreshDemo()
+        # Only refresh if the button actually changed
+        if changed == True:
+            self.RefreshDemo()
 
 
     def OnLeftDown(self, event):
         pnt = event.GetPosition()
-        elem_rect = self._pdc.GetWxRect('button')
-
-        # Create a 1x1 rect for the mouse pointer
-        mouse_pnt = wx.Rect(pnt[0], pnt[1], 1, 1) 
         
-        if mouse_pnt.Intersects(elem_rect) == True:
-            self._pdc.UpdateElem('button:press')
-            self._pdc.UpdateElem('button-text:hover')
+        if 'button' in self._pdc.HitTest(pnt):
+            # Draw both elements at once
+            with self._pdc.Batch():
+                self._pdc.UpdateElem('button:press')
+                self._pdc.UpdateElem('button-text:hover')
 
         self.RefreshDemo()
 
     def OnLeftUp(self, event):
         pnt = event.GetPosition()
-        elem_rect = self._pdc.GetWxRect('button')
-
-        # Create a 1x1 rect for the mouse pointer
-        mouse_pnt = wx.Rect(pnt[0], pnt[1], 1, 1) 
         
-        if mouse_pnt.Intersects(elem_rect) == True:
-            self._pdc.UpdateElem('button')
-            self._pdc.UpdateElem('button-text')
+        if 'button' in self._pdc.HitTest(pnt):
+            with self._pdc.Batch():
+                self._pdc.UpdateElem('button')
+                self._pdc.UpdateElem('button-text')
             self.ButtonCallback()
             
         self.RefreshDemo()
@@ -94,9 +89,10 @@ class MainApplication(UIStyleFrame):
 
 
     def RefreshDemo(self):
-        rect = wx.Rect(0, 0, self.Size[0], self.Size[1])
-        self.RefreshRect(rect, False)
-        self.Refresh()
+        # Only repaint the area of the elements that changed
+        rect = self._pdc.PopDirtyRect()
+        if rect.IsEmpty() == False:
+            self.RefreshRect(rect, False)
 
     def ButtonCallback(self):
         notify = wx.adv.NotificationMessage(
@@ -1,4 +1,46 @@
-from .context import UIStylePDC
-from .widgets import UIStyleApp, UIStyleFrame, UIStylePanel, UIStyleStaticText
+import importlib
+
 from .lang import UIStyleLangParser
-from .utils import ReadRawFile, MergeParsedStyles
+from .registry import StyleSheet, StyleSheetRegistry, GetStyleSheetRegistry
+from .cache import EnableCompiledCache, DisableCompiledCache
+from .watcher import StyleSheetWatcher
+from .loader import (LoadStyleSheetFuture, LoadStyleSheetsFuture,
+                     LoadStyleSheetAsync, LoadStyleSheetsAsync)
+from .utils import ReadRawFile, MapRawFile, MergeParsedStyles
+
+# The modules that need wxPython are imported the first time one of their
+# names is used, so that the parser, registry and loaders (e.g: in the
+# benchmarks) can be used without importing wx.
+_WX_EXPORTS = {
+    "UIStylePDC": "context",
+    "UIStyleApp": "widgets",
+    "UIStyleFrame": "widgets",
+    "UIStylePanel": "widgets",
+    "UIStyleStaticText": "widgets",
+    "ResourcePool": "resources",
+    "BitmapCache": "resources",
+    "FontCache": "resources",
+    "TextExtentCache": "resources",
+    "LayerCache": "resources",
+    "GetLayerCache": "resources",
+}
+
+__all__ = list(_WX_EXPORTS) + [
+    "UIStyleLangParser",
+    "StyleSheet", "StyleSheetRegistry", "GetStyleSheetRegistry",
+    "EnableCompiledCache", "DisableCompiledCache",
+    "StyleSheetWatcher",
+    "LoadStyleSheetFuture", "LoadStyleSheetsFuture",
+    "LoadStyleSheetAsync", "LoadStyleSheetsAsync",
+    "ReadRawFile", "MapRawFile", "MergeParsedStyles",
+]
+
+
+def __getattr__(name):
+    try:
+        module_name = _WX_EXPORTS[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    globals()[name] = value
+    return value
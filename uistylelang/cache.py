@@ -0,0 +1,164 @@
+# UI Style Lang Copyright 2020-2023 Noah Rahm
+
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+
+#     1. Redistributions of source code must retain the above copyright notice, 
+#        this list of conditions and the following disclaimer.
+    
+#     2. Redistributions in binary form must reproduce the above copyright 
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+
+#     3. The names of Noah Rahm, Correct Syntax and any contributers may not be 
+#        used to endorse or promote products derived from this software without 
+#        specific prior written permission.  
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Persistent on-disk cache of parsed stylesheets
+# For consistency with the wxPython methods, title-case is used in this file
+
+# The cache is a JSON file holding the parsed stylesheet,
+# along with the hash of the stylesheet text it was made from and the
+# version of the format. It is only used when both match, so a stale or
+# corrupt cache falls back to parsing the stylesheet (and rewriting the
+# cache). JSON is used rather than pickle so that loading a cache file
+# can never run code.
+
+import hashlib
+import json
+import os
+
+
+# Bump whenever the parser output or the layout of the file changes
+COMPILED_CACHE_VERSION = 2
+
+COMPILED_CACHE_SUFFIX = ".cache"
+
+_cache_enabled = False
+_cache_dir = None
+
+
+def EnableCompiledCache(cache_dir=None):
+    """ Enable the on-disk cache of parsed stylesheets.
+
+    :param str cache_dir: directory to write the cache files into. Defaults to writing them next to each stylesheet file (e.g: ``styles.uiss.cache``). Stylesheet strings are only cached when a directory is given.
+    """
+    global _cache_enabled, _cache_dir
+    _cache_enabled = True
+    _cache_dir = cache_dir
+
+
+def DisableCompiledCache():
+    """ Disable the on-disk cache of parsed stylesheets. Existing cache files are left as they are. """
+    global _cache_enabled, _cache_dir
+    _cache_enabled = False
+    _cache_dir = None
+
+
+def IsCompiledCacheEnabled():
+    return _cache_enabled
+
+
+def GetSourceHash(raw_stylesheet):
+    """ Get the hash of the stylesheet text, which the cache is keyed by. """
+    return hashlib.sha1(raw_stylesheet.encode("utf-8")).hexdigest()
+
+
+def GetCompiledCachePath(path, source_hash):
+    """ Get the path of the cache file of the stylesheet.
+
+    :param str path: resolved path of the stylesheet file, or ``None`` for strings
+    :returns: the path, or ``None`` if the stylesheet can't be cached
+    """
+    if _cache_dir is not None:
+        if path is not None:
+            name = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        else:
+            name = source_hash
+        return os.path.join(_cache_dir, name + COMPILED_CACHE_SUFFIX)
+
+    if path is not None:
+        return path + COMPILED_CACHE_SUFFIX
+    return None
+
+
+def LoadCompiledStyleSheet(path, raw_stylesheet):
+    """ Load the parsed stylesheet from the cache. 
+
+    :param str path: resolved path of the stylesheet file, or ``None`` for strings
+    :param str raw_stylesheet: the stylesheet text
+    :returns: the parsed styles, or ``None`` if there is no fresh cache
+    """
+    if _cache_enabled == False:
+        return None
+
+    source_hash = GetSourceHash(raw_stylesheet)
+    cache_path = GetCompiledCachePath(path, source_hash)
+    if cache_path is None:
+        return None
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            data = json.load(cache_file)
+        if (data["version"] != COMPILED_CACHE_VERSION 
+                or data["source_hash"] != source_hash):
+            return None
+        parsed_styles = data["parsed"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing or corrupt
+        return None
+
+    if not isinstance(parsed_styles, dict):
+        return None
+    return parsed_styles
+
+
+def SaveCompiledStyleSheet(path, raw_stylesheet, parsed_styles):
+    """ Write the parsed stylesheet to the cache. Failing to write 
+    the cache is not an error; the stylesheet is just parsed again 
+    next time.
+
+    :returns: whether the cache was written
+    """
+    if _cache_enabled == False:
+        return False
+
+    source_hash = GetSourceHash(raw_stylesheet)
+    cache_path = GetCompiledCachePath(path, source_hash)
+    if cache_path is None:
+        return False
+
+    data = {
+        "version": COMPILED_CACHE_VERSION,
+        "source_hash": source_hash,
+        "parsed": parsed_styles,
+    }
+
+    # Write to a temporary file first so that readers
+    # never see a partly written cache.
+    temp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+    try:
+        if _cache_dir is not None:
+            os.makedirs(_cache_dir, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(data, cache_file, separators=(",", ":"))
+        os.replace(temp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+    return True
@@ -54,12 +54,20 @@
 
 
 import copy
+import itertools
+import math
+from collections import OrderedDict
 
 import wx
 import wx.adv
+from wx.adv import PseudoDC
 
-from .lang import UIStyleLangParser
-from .utils import ReadRawFile
+from .lang import UIStyleLangParser, clean_property
+from .resources import (ResourcePool, BitmapCache, FontCache, TextExtentCache, 
+                        GetLayerCache)
+from .registry import GetStyleSheetRegistry
+from .spatial import SpatialGrid
+from .watcher import StyleSheetWatcher
 
 
 # Note: "type" gets set on runtime; no need to put it in here
@@ -82,23 +90,245 @@ SUPPORTED_PROPERTIES = {
     "text-transform": "none",
 }
 
+# Resolved values of the keyword properties. Keywords which are
+# not in these tables leave the font of the parent window as is.
+FONT_SIZES = {
+    "medium": 0,
+    "smaller": -1,
+    "larger": 1,
+}
+
+FONT_WEIGHTS = {
+    "normal": wx.FONTWEIGHT_NORMAL,
+    "400": wx.FONTWEIGHT_NORMAL,
+    "bold": wx.FONTWEIGHT_BOLD,
+    "700": wx.FONTWEIGHT_BOLD,
+    "100": wx.FONTWEIGHT_THIN,
+    "200": wx.FONTWEIGHT_EXTRALIGHT,
+    "300": wx.FONTWEIGHT_LIGHT,
+    "500": wx.FONTWEIGHT_MEDIUM,
+    "600": wx.FONTWEIGHT_SEMIBOLD,
+    "800": wx.FONTWEIGHT_EXTRABOLD,
+    "900": wx.FONTWEIGHT_HEAVY,
+    "1000": wx.FONTWEIGHT_EXTRAHEAVY,
+}
+
+FONT_STYLES = {
+    "normal": wx.FONTSTYLE_NORMAL,
+    "italic": wx.FONTSTYLE_ITALIC,
+}
+
+TEXT_TRANSFORMS = {
+    "none": None,
+    "lowercase": str.lower,
+    "uppercase": str.upper,
+    "capitalize": str.capitalize,
+}
+
+
+class CompiledStyle(object):
+    """ The styles of one pseudo-id of an element, resolved to 
+    the values used for drawing (numbers, ``wx.Colour`` objects 
+    and wxPython font constants). Colours, pens and brushes come 
+    from the ``ResourcePool`` shared by the elements of the PDC.
+    
+    Compiled whenever the styles change so that drawing the 
+    element doesn't need to parse any strings.
+    """
+    __slots__ = (
+        "color", "background", "background_color", "border_radius",
+        "border_width", "border_color", "top", "left", "width", "height",
+        "font_size", "font_weight", "font_style", "underline",
+        "transform_rotate", "text_transform", "pen", "brush",
+    )
+
+    def __init__(self, styles, resources):
+        self.color = resources.GetColour(clean_property(styles["color"]))
+        self.background = resources.GetColour(clean_property(styles["background"]))
+        self.background_color = resources.GetColour(clean_property(styles["background-color"]))
+        self.border_radius = clean_property(styles["border-radius"])
+        self.border_width = clean_property(styles["border-width"])
+        self.border_color = resources.GetColour(clean_property(styles["border-color"]))
+        self.top = clean_property(styles["top"])
+        self.left = clean_property(styles["left"])
+        self.width = clean_property(styles["width"])
+        self.height = clean_property(styles["height"])
+        self.font_size = FONT_SIZES.get(styles["font-size"], 0)
+        self.font_weight = FONT_WEIGHTS.get(styles["font-weight"])
+        self.font_style = FONT_STYLES.get(styles["font-style"])
+        self.underline = styles["text-decoration"] == "underline"
+        self.transform_rotate = clean_property(styles["transform-rotate"])
+        self.text_transform = TEXT_TRANSFORMS.get(styles["text-transform"])
+
+        self.pen = resources.GetPen(clean_property(styles["border-color"]), self.border_width)
+        self.brush = resources.GetBrush(clean_property(styles["background-color"]))
+
+
+class ComputedStyle(object):
+    """ The styles of one pseudo-id of an element, as a mapping of property 
+    to value. 
+    
+    Properties which are not declared fall back to the ``SUPPORTED_PROPERTIES``
+    defaults shared by all elements, and the declared properties are shared 
+    with the parsed stylesheet until the first time a property is set, when 
+    they are copied (copy-on-write).
+
+    :param declared: mapping of the properties declared in the stylesheet
+    """
+    __slots__ = ("_declared", "_owned")
+
+    def __init__(self, declared=None):
+        self._declared = declared if declared is not None else {}
+        self._owned = declared is None
+
+    def __getitem__(self, prop):
+        try:
+            return self._declared[prop]
+        except KeyError:
+            return SUPPORTED_PROPERTIES[prop]
+
+    def __setitem__(self, prop, value):
+        if not self._owned:
+            self._declared = dict(self._declared)
+            self._owned = True
+        self._declared[prop] = value
+
+    def __contains__(self, prop):
+        return prop in self._declared or prop in SUPPORTED_PROPERTIES
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, ComputedStyle):
+            other = other.copy()
+        return self.copy() == other
+
+    def __repr__(self):
+        return "ComputedStyle({!r})".format(self.copy())
+
+    def keys(self):
+        keys = list(SUPPORTED_PROPERTIES)
+        keys.extend(prop for prop in self._declared if prop not in SUPPORTED_PROPERTIES)
+        return keys
+
+    def items(self):
+        return [(prop, self[prop]) for prop in self.keys()]
+
+    def get(self, prop, default=None):
+        try:
+            return self[prop]
+        except KeyError:
+            return default
+
+    def copy(self):
+        """ Get the styles as a new ``dict``. """
+        styles_dict = dict(SUPPORTED_PROPERTIES)
+        styles_dict.update(self._declared)
+        return styles_dict
+
+
+def GetRotatedBounds(x, y, width, height, angle):
+    """ Get the bounding rect of a ``width`` by ``height`` rect at ``x``, ``y`` 
+    rotated counter-clockwise by ``angle`` degrees around its top left corner 
+    (as ``DrawRotatedText`` does). 
+
+    :returns: `wx.Rect`
+    """
+    if angle == 0:
+        left = math.floor(x)
+        top = math.floor(y)
+        return wx.Rect(left, top, math.ceil(x + width) - left, math.ceil(y + height) - top)
+
+    radians = math.radians(angle)
+    cos = math.cos(radians)
+    sin = math.sin(radians)
+
+    # Corners relative to the top left corner, with the y axis pointing down
+    xs = [0, width * cos, height * sin, width * cos + height * sin]
+    ys = [0, -width * sin, height * cos, height * cos - width * sin]
+
+    left = math.floor(x + min(xs))
+    top = math.floor(y + min(ys))
+    return wx.Rect(
+        left, top, math.ceil(x + max(xs)) - left, math.ceil(y + max(ys)) - top
+        )
+
 
 class Element(object):
-    """ Represents an abstract element object drawn on the DC. """
-    def __init__(self, elem_id):
+    """ Represents an abstract element object drawn on the DC. 
+
+    :param str elem_id: id selector of the element
+    :param resources: ``ResourcePool`` to get colours, pens and brushes from. Defaults to a new pool for this element.
+    """
+    def __init__(self, elem_id, resources=None):
         self.id_selector = elem_id
+        self.resources = resources if resources is not None else ResourcePool()
         self.wx_id = wx.NewIdRef()
         self.elem_type = "SHAPE"
         self.current_styles = {}
+        self.compiled_styles = {}
         self.rect = wx.Rect(0, 0, 0, 0)
+        self.bounds = wx.Rect(0, 0, 0, 0) # area covered when drawn
+        self.draw_order = None # position in the PDC, set when first drawn
         self.content = "" # holds file path/text values
+        self.style_version = 0 # bumped whenever the styles change or the element is invalidated
+        self.stale_pseudo_ids = set() # merged, but not compiled yet
+        self.drawn_state = None # state the element was last drawn in
+        self.draw_plans = {} # DrawPlan of each pseudo id, see UIStylePDC.CompileDrawPlan
+        self.cache_hint = False # drawn from an offscreen bitmap, see UIStylePDC.SetCacheHint
 
     def InitStyles(self, styles):
-        self.current_styles = styles
-        for pseudo_id in self.current_styles:
-            for prop in SUPPORTED_PROPERTIES.keys():
-                if prop not in self.current_styles[pseudo_id].keys():
-                    self.current_styles[pseudo_id][prop] = copy.copy(SUPPORTED_PROPERTIES[prop])
+        # The parsed styles are shared, not copied. Any 
+        # styles that are not declared will be the defaults.
+        self.current_styles = {}
+        for pseudo_id in styles:
+            self.current_styles[pseudo_id] = ComputedStyle(styles[pseudo_id])
+
+        # Each pseudo id is compiled the first time it is drawn, since most 
+        # elements are only ever drawn in a few of them. See: GetCompiledStyles
+        self.style_version += 1
+        self.compiled_styles = {}
+        self.draw_plans.clear()
+        self.stale_pseudo_ids.clear()
+
+    def CompileStyles(self, pseudo_id=None):
+        """ Resolves the current styles into a ``CompiledStyle``.
+
+        :param pseudo_id: pseudo id to compile the styles of. Defaults to all of them.
+        """
+        self.style_version += 1
+        if pseudo_id is None:
+            self.draw_plans.clear()
+            self.stale_pseudo_ids.clear()
+            for pseudo_id in self.current_styles:
+                self.compiled_styles[pseudo_id] = CompiledStyle(
+                    self.current_styles[pseudo_id], self.resources
+                    )
+        else:
+            self.draw_plans.pop(pseudo_id, None)
+            self.compiled_styles[pseudo_id] = CompiledStyle(
+                self.current_styles[pseudo_id], self.resources
+                )
+            self.stale_pseudo_ids.discard(pseudo_id)
+
+    def ResetStyles(self, pseudo_id, styles=None):
+        """ Replace the styles of the pseudo id with newly parsed styles (e.g: 
+        when the stylesheet is reloaded), dropping any inline styles merged 
+        into them.
+
+        :param styles: the parsed styles of the pseudo id. Defaults to no declared styles, so that the defaults are used.
+        """
+        self.current_styles[pseudo_id] = ComputedStyle(styles)
+        self.CompileStyles(pseudo_id)
+
+    def CompileStaleStyles(self):
+        """ Compiles the styles that were merged with ``defer_compile``. """
+        for pseudo_id in list(self.stale_pseudo_ids):
+            self.CompileStyles(pseudo_id)
 
     def GetId(self):
         return self.id_selector
@@ -108,7 +338,9 @@ class Element(object):
 
     def SetType(self, elem_type):
         if elem_type in ["SHAPE", "TEXT", "IMAGE"]:
-            self.elem_type = elem_type
+            if elem_type != self.elem_type:
+                self.elem_type = elem_type
+                self.draw_plans.clear()
         else:
             raise RuntimeError("Invalid element type. Must be one of: SHAPE, TEXT, IMAGE") 
 
@@ -120,53 +352,241 @@ class Element(object):
 
     def SetStyles(self, styles):
         self.current_styles = styles
+        self.compiled_styles = {}
+        self.CompileStyles()
 
     def GetStyles(self, pseudo_id=""):
         if pseudo_id == "":
             return self.current_styles
         return self.current_styles[pseudo_id]
 
+    def GetCompiledStyles(self, pseudo_id):
+        try:
+            return self.compiled_styles[pseudo_id]
+        except KeyError:
+            pass
+        compiled_style = CompiledStyle(self.current_styles[pseudo_id], self.resources)
+        self.compiled_styles[pseudo_id] = compiled_style
+        return compiled_style
+
+    def GetDrawState(self, pseudo_id):
+        """ Get the state that drawing the element in the pseudo id depends on. """
+        return (pseudo_id, self.elem_type, self.content, self.style_version)
+
+    def SetDrawnState(self, state):
+        self.drawn_state = state
+
+    def GetDrawPlan(self, pseudo_id):
+        """ Get the compiled draw plan of the pseudo id, or ``None`` if it needs compiling. """
+        return self.draw_plans.get(pseudo_id)
+
+    def SetDrawPlan(self, pseudo_id, plan):
+        self.draw_plans[pseudo_id] = plan
+
+    def InvalidateDrawPlans(self):
+        """ Clear the draw plans, so that they are compiled again the next 
+        time the element is drawn. The element is no longer taken to be 
+        drawn in its current state (see: ``IsDrawnAs``), so that updating it 
+        draws it again, even in the same pseudo id.
+        """
+        self.draw_plans.clear()
+        self.style_version += 1
+
+    def IsDrawnAs(self, pseudo_id):
+        """ Whether the element was last drawn in the pseudo id with the 
+        current content and styles. The same as comparing ``GetDrawnState`` 
+        and ``GetDrawState``, without making the state tuple.
+        """
+        drawn_state = self.drawn_state
+        return (drawn_state is not None 
+                and drawn_state[3] == self.style_version
+                and drawn_state[0] == pseudo_id
+                and drawn_state[2] == self.content
+                and drawn_state[1] == self.elem_type)
+
+    def GetDrawnState(self):
+        return self.drawn_state
+
     def SetRect(self, rect):
         self.rect = rect
 
     def GetRect(self):
         return self.rect
 
+    def SetBounds(self, bounds):
+        self.bounds = bounds
+
+    def SetDrawOrder(self, draw_order):
+        self.draw_order = draw_order
+
+    def GetDrawOrder(self):
+        return self.draw_order
+
+    def GetBounds(self):
+        return self.bounds
+
     def SetContent(self, content=""):
-        if content != "":
+        if content != "" and content != self.content:
             self.content = content
+            self.draw_plans.clear()
 
     def GetContent(self):
         return self.content
 
-    def MergeStyles(self, pseudo_id, new_styles):
+    def SetCacheHint(self, cache_hint):
+        """ Set whether the element is drawn from an offscreen bitmap.
+
+        :returns: whether the hint changed, in which case the element is no longer taken to be drawn in its current state (see: ``InvalidateDrawPlans``)
+        """
+        if cache_hint == self.cache_hint:
+            return False
+        self.cache_hint = cache_hint
+        self.InvalidateDrawPlans()
+        return True
+
+    def GetCacheHint(self):
+        return self.cache_hint
+
+    def MergeStyles(self, pseudo_id, new_styles, defer_compile=False):
         """ Merge new styles and the current styles.
         
         :param pseudo_id: pseudo id of this element of which to update with the new styles
         :param new_styles: new styles to merge with the current styles
+        :param defer_compile: if ``True``, the styles are only compiled when ``CompileStaleStyles`` is called
+        :returns: whether any of the styles changed
         """
+        changed = False
 
-        if new_styles != "":
+        if new_styles:
             # We only apply styles to this pseudo-id selector
+            styles_dict = self.current_styles[pseudo_id]
             for prop in new_styles:
+                if prop in styles_dict and styles_dict[prop] == new_styles[prop]:
+                    continue
+
                 # Make a copy so that we don't overwrite
                 new_prop_val = copy.copy(new_styles[prop])
 
                 # Merge the UI Style Lang properties. Any styles that are not 
                 # specified will automatically be the default ones.
-                self.current_styles[pseudo_id][prop] = new_prop_val
+                styles_dict[prop] = new_prop_val
+                changed = True
+
+            if changed and defer_compile:
+                self.stale_pseudo_ids.add(pseudo_id)
+            elif changed:
+                self.CompileStyles(pseudo_id)
+
+        return changed
+
+
+class DrawPlan(object):
+    """ The drawing operations of an element in a pseudo id, with their 
+    arguments already resolved from the styles and content, so that 
+    drawing the element again is a straight replay. See: ``UIStylePDC.CompileDrawPlan``
+
+    :param ops: list of ``(function, args)`` tuples, where the function is called with the PDC and the args
+    :param rect: `wx.Rect` of the element
+    :param bounds: `wx.Rect` of the area covered when drawn
+    """
+    __slots__ = ("ops", "rect", "bounds")
+
+    def __init__(self, ops, rect, bounds):
+        self.ops = ops
+        self.rect = rect
+        self.bounds = bounds
+
+
+class ElementHandle(object):
+    """ An element and pseudo id resolved ahead of time, so that they don't 
+    have to be looked up from an id statement on every update. 
+    See: ``UIStylePDC.GetHandle``
+    """
+    __slots__ = ("element", "elem_id", "pseudo_id")
+
+    def __init__(self, element, pseudo_id):
+        self.element = element
+        self.elem_id = element.GetId()
+        self.pseudo_id = pseudo_id
+
+    def __repr__(self):
+        return "ElementHandle('{}:{}')".format(self.elem_id, self.pseudo_id)
+
+    def GetElement(self):
+        return self.element
+
+    def GetId(self):
+        return self.elem_id
+
+    def GetPseudoId(self):
+        return self.pseudo_id
+
+
+class UpdateBatch(object):
+    """ Context manager of a batch of element updates. See: ``UIStylePDC.Batch`` """
+    def __init__(self, pdc):
+        self.pdc = pdc
+        self.dirty_rect = None
+
+    def __enter__(self):
+        self.pdc.BeginBatch()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.dirty_rect = self.pdc.CommitBatch()
+        return False
+
+
+# Namespaces of the PDCs in the shared layer cache
+_layer_namespaces = itertools.count()
 
 
 class UIStylePDC(wx.adv.PseudoDC):
+    """ Wrapper of ``wx.adv.PseudoDC`` which draws the elements declared in the stylesheet.
+
+    :param parent: the window the PDC is drawn on
+    :param file: path to the stylesheet, string with the comment-header or a `StyleSheet` (e.g: from ``LoadStyleSheetFuture``)
+    """
     def __init__(self, parent, file):
         wx.adv.PseudoDC.__init__(self)
 
         self._parent_window = parent
-        self._raw_stylesheet = ReadRawFile(file)
+        self._watcher = None
+
+        # The stylesheet is read and parsed once per process
+        self._stylesheet = GetStyleSheetRegistry().GetStyleSheet(file)
+        self._stylesheet_file = self._stylesheet.GetSource()
+        self._raw_stylesheet = self._stylesheet.GetRawStyleSheet()
         self._lang_parser = UIStyleLangParser(self.GetRawStyleSheet())
-        self._parsed_styles_data = self.LangParser.parse()
+        self._parsed_styles_data = self._stylesheet.ParsedStyles
         self._uisl_elements = {}
 
+        # Colours, pens and brushes shared by all of the elements
+        self._resources = ResourcePool()
+
+        # Decoded bitmaps of the image elements
+        self._bitmaps = BitmapCache()
+
+        # Fonts of the text elements, derived from the font of the parent
+        self._fonts = FontCache()
+        self._text_extents = TextExtentCache()
+        if hasattr(wx, "EVT_DPI_CHANGED"):
+            parent.Bind(wx.EVT_DPI_CHANGED, self._OnDPIChanged)
+
+        # Area that changed since the last time it was cleared
+        self._dirty_rect = wx.Rect(0, 0, 0, 0)
+
+        # Index of the element bounds for hit-testing
+        self._spatial_index = SpatialGrid()
+        self._draw_count = 0
+
+        # Elements queued to be drawn when the batch is committed
+        self._batch_depth = 0
+        self._batch_queue = OrderedDict()
+
+        # Namespace of the bitmaps of this PDC in the shared layer cache
+        self._layer_namespace = next(_layer_namespaces)
+
         self._InitDeviceContext()
 
     def _InitDeviceContext(self):
@@ -177,27 +597,246 @@ class UIStylePDC(wx.adv.PseudoDC):
         for id_selector in self.ParsedStyles:
 
             styles = self.ParsedStyles[id_selector]
-            elem = Element(id_selector)
+            elem = Element(id_selector, self._resources)
             elem.InitStyles(styles)
             self._uisl_elements[id_selector] = elem
  
     def GetRawStyleSheet(self):
         return self._raw_stylesheet
 
+    def GetStyleSheet(self):
+        """ Get the shared, read-only ``StyleSheet`` of the PDC. """
+        return self._stylesheet
+
     @property
     def ParsedStyles(self):
         return self._parsed_styles_data
 
+    def WatchStyleSheet(self, interval=0.25, debounce=0.1, callback=None):
+        """ Reload the stylesheet file whenever it is saved. The file is 
+        re-parsed in a background thread, then (on the UI thread) only the 
+        changed styles are recompiled and only the elements drawn in them 
+        are redrawn. The changed area of the parent window is refreshed.
+
+        Inline styles merged into a changed pseudo id are dropped.
+
+        :param float interval: seconds between checks of the file
+        :param float debounce: seconds the file must stay unchanged before it is reloaded
+        :param callback: called with the set of changed ``(id, pseudo_id)`` blocks after the elements are redrawn
+        :returns: `StyleSheetWatcher`
+        """
+        if self._watcher is not None:
+            self.UnwatchStyleSheet()
+        self._watcher_callback = callback
+        self._watcher = StyleSheetWatcher(
+            self._stylesheet_file, self._OnStyleSheetChanged, wx.CallAfter, 
+            interval, debounce, self._stylesheet
+            )
+        self._watcher.Start()
+        return self._watcher
+
+    def UnwatchStyleSheet(self):
+        """ Stop reloading the stylesheet file when it is saved. """
+        if self._watcher is not None:
+            self._watcher.Stop()
+            self._watcher = None
+
+    def GetReloadStats(self):
+        """ Get the timings of the last reload of the watched stylesheet. See: ``StyleSheetWatcher.GetStats`` """
+        if self._watcher is None:
+            return None
+        return self._watcher.GetStats()
+
+    def _OnStyleSheetChanged(self, stylesheet, changed):
+        self._stylesheet = stylesheet
+        self._raw_stylesheet = stylesheet.GetRawStyleSheet()
+        self._lang_parser = UIStyleLangParser(self.GetRawStyleSheet())
+        self._parsed_styles_data = stylesheet.ParsedStyles
+
+        self.BeginBatch()
+        for elem_id, pseudo_id in changed:
+            styles = self.ParsedStyles.get(elem_id)
+            elem = self._uisl_elements.get(elem_id)
+
+            if elem is None:
+                # Newly declared element
+                if styles is not None:
+                    elem = Element(elem_id, self._resources)
+                    elem.InitStyles(styles)
+                    self._uisl_elements[elem_id] = elem
+                continue
+
+            elem.ResetStyles(pseudo_id, styles.get(pseudo_id) if styles is not None else None)
+
+            # Only redraw the elements currently drawn in a changed pseudo id
+            drawn_state = elem.GetDrawnState()
+            if drawn_state is not None and drawn_state[0] == pseudo_id:
+                self._batch_queue[elem_id] = pseudo_id
+        self.CommitBatch()
+
+        if not self.IsBatching():
+            dirty_rect = self.PopDirtyRect()
+            if not dirty_rect.IsEmpty():
+                self._parent_window.RefreshRect(dirty_rect, False)
+
+        if self._watcher_callback is not None:
+            self._watcher_callback(changed)
+
     @property
     def LangParser(self):
         return self._lang_parser
 
+    @property
+    def Resources(self):
+        """ The ``ResourcePool`` of colours, pens and brushes shared by the elements. """
+        return self._resources
+
+    @property
+    def Bitmaps(self):
+        """ The ``BitmapCache`` of decoded images of the image elements. """
+        return self._bitmaps
+
+    def InvalidateImage(self, img_path=None):
+        """ Remove the cached bitmaps of the image file so that it is read 
+        from the disk the next time it is drawn. The next ``UpdateElem`` of 
+        the image elements draws them again, even in the same pseudo id.
+
+        :param str img_path: path of the image file. Defaults to all images.
+        """
+        self._bitmaps.Invalidate(img_path)
+
+        # The size of the image is part of the draw plans
+        for elem in self._uisl_elements.values():
+            if elem.GetType() == "IMAGE" and (img_path is None or elem.GetContent() == img_path):
+                elem.InvalidateDrawPlans()
+
+        # The image may be drawn in the bitmap of a retained element
+        self.InvalidateLayers()
+
+    @property
+    def Fonts(self):
+        """ The ``FontCache`` of the fonts of the text elements. """
+        return self._fonts
+
+    @property
+    def TextExtents(self):
+        """ The ``TextExtentCache`` of the measured sizes of the text of the text elements. """
+        return self._text_extents
+
+    def GetBaseFont(self):
+        """ Get the font of the parent window, which the fonts of the text elements are derived from. """
+        if self._fonts.GetBaseFont() is None:
+            self._fonts.SetBaseFont(self._parent_window.GetFont())
+        return self._fonts.GetBaseFont()
+
+    def InvalidateFonts(self, force=False):
+        """ Check whether the font of the parent window changed, in which case 
+        the derived fonts are created again and the text elements are drawn 
+        again with the new fonts right away. Call this after changing the 
+        font of the parent window, then refresh the dirty rect (see: 
+        ``PopDirtyRect``). It is called automatically when the DPI changes.
+
+        :param bool force: create the fonts again even if the font of the parent window is the same
+        :returns: whether the fonts were invalidated
+        """
+        if not self._fonts.SetBaseFont(self._parent_window.GetFont(), force):
+            return False
+
+        # The text is measured again with the new fonts
+        self._text_extents.Clear()
+        self.InvalidateLayers()
+
+        text_elems = [elem for elem in self._uisl_elements.values() if elem.GetType() == "TEXT"]
+        for elem in text_elems:
+            elem.InvalidateDrawPlans()
+        self._RedrawElements(text_elems)
+        return True
+
+    def _OnDPIChanged(self, event):
+        if self.InvalidateFonts(force=True) and not self.IsBatching():
+            dirty_rect = self.PopDirtyRect()
+            if not dirty_rect.IsEmpty():
+                self._parent_window.RefreshRect(dirty_rect, False)
+        event.Skip()
+
+    def _RedrawElements(self, elems):
+        """ Draw the elements again in the pseudo ids they are drawn in, adding them to the dirty rect. Elements which were never drawn are left as they are.
+
+        For internal use only.
+        """
+        self.BeginBatch()
+        for elem in elems:
+            drawn_state = elem.GetDrawnState()
+            if drawn_state is not None:
+                # Updates already queued in a batch take precedence
+                self._batch_queue.setdefault(elem.GetId(), drawn_state[0])
+        self.CommitBatch()
+
+    @property
+    def Layers(self):
+        """ The ``LayerCache`` of the bitmaps of the elements drawn in retained mode, shared by all of the PDCs. See: ``SetCacheHint`` """
+        return GetLayerCache()
+
+    def SetCacheHint(self, elem_id, cache=True):
+        """ Draw the element in retained mode: it is rendered once into an 
+        offscreen bitmap for each pseudo-id, content and styles, and the PDC 
+        then only has to draw the bitmap when it is painted. This is worth it 
+        for elements which are expensive to rasterize, such as rotated text, 
+        rotated images and rounded rects with borders, but costs 4 bytes per 
+        pixel of the bounds of the element. The bitmaps are rendered with a 
+        ``wx.GCDC``, so they are anti-aliased.
+
+        If the hint changes and the element is already drawn, it is drawn 
+        again right away in the same pseudo id and its bounds are added to 
+        the dirty rect (see: ``PopDirtyRect``). The bitmaps are kept in the 
+        ``LayerCache`` shared by the whole process (see: ``Layers``).
+
+        :param str elem_id: id of the element (must be already declared in the intial stylesheet)
+        :param bool cache: whether to draw the element from an offscreen bitmap
+        """
+        elem = self._uisl_elements[elem_id]
+        if elem.SetCacheHint(cache):
+            self._RedrawElements([elem])
+
+    def InvalidateLayers(self):
+        """ Remove the offscreen bitmaps of the elements of this PDC from the ``LayerCache``. They are rendered again the next time the elements are drawn. """
+        GetLayerCache().Invalidate(self._layer_namespace)
+
+    def InvalidateDrawPlans(self):
+        """ Clear the draw plans of all of the elements, so that they are compiled again the next time they are drawn. The next ``UpdateElem`` of each element draws it again, even in the same pseudo id. """
+        for elem in self._uisl_elements.values():
+            elem.InvalidateDrawPlans()
+
     def CleanProperty(self, prop):
         return self.LangParser.clean_property(prop)
 
+    def GetDirtyRect(self):
+        """ Get the area of the window covered by the elements drawn since the dirty rect was last cleared. This is the union of the old and the new bounds of each element, so it can be passed to ``RefreshRect`` instead of refreshing the whole window.
+
+        :returns: `wx.Rect` which is empty if nothing changed
+        """
+        return wx.Rect(self._dirty_rect)
+
+    def ClearDirtyRect(self):
+        """ Clear the dirty rect. See also: ``GetDirtyRect`` """
+        self._dirty_rect = wx.Rect(0, 0, 0, 0)
+
+    def PopDirtyRect(self):
+        """ Get the dirty rect and clear it. See also: ``GetDirtyRect``
+
+        :returns: `wx.Rect` which is empty if nothing changed
+        """
+        dirty_rect = self._dirty_rect
+        self._dirty_rect = wx.Rect(0, 0, 0, 0)
+        return dirty_rect
+
+    def _AddDirtyRect(self, rect):
+        if not rect.IsEmpty():
+            self._dirty_rect = self._dirty_rect.Union(rect)
+
 
     def GetWxRect(self, elem_id):
-        """ Get the wxPython Rect of the element.
+        """ Get the wxPython Rect of the element. For text elements, this is the rect of the measured (and rotated) text.
 
         :param str elem_id: id to of the element (must be already declared in the intial stylesheet)
         :returns: `wx.Rect`
@@ -216,170 +855,261 @@ class UIStylePDC(wx.adv.PseudoDC):
 
         return elem.GetWxId()
 
+    def HitTest(self, point):
+        """ Get the elements drawn at the point. 
+
+        Example:
+
+        .. code-block::
+
+            >> if 'button' in dc.HitTest(event.GetPosition()):
+            >>     dc.UpdateElem('button:hover')
+
+        :param point: `wx.Point` or ``(x, y)`` tuple, e.g: the mouse position
+        :returns: list of the element ids, topmost (last drawn) first
+        """
+        return self._spatial_index.QueryPoint(point[0], point[1])
+
+    def HitTestRect(self, rect):
+        """ Get the elements drawn in the rect. 
+
+        :param rect: `wx.Rect` or ``(x, y, width, height)`` tuple
+        :returns: list of the element ids, topmost (last drawn) first
+        """
+        return self._spatial_index.QueryRect(rect)
+
     def DrawElem(self, elem_id, pseudo_id):
-        """ Draws the current element on the PDC. """
+        """ Draws the current element on the PDC. The draw plan of the 
+        element is compiled the first time, and replayed after that until 
+        the styles or content of the element change.
+        """
         elem = self._uisl_elements[elem_id]
         wx_id = elem.GetWxId()
 
+        plan = elem.GetDrawPlan(pseudo_id)
+        if plan is None:
+            plan = self.CompileDrawPlan(elem, pseudo_id)
+            elem.SetDrawPlan(pseudo_id, plan)
+
         self.ClearId(wx_id)
         self.SetId(wx_id)
 
-        #print(elem.GetStyles(pseudo_id))
+        for func, args in plan.ops:
+            func(self, *args)
+
+        elem.SetDrawnState(elem.GetDrawState(pseudo_id))
+        elem.SetRect(wx.Rect(plan.rect))
+        bounds = wx.Rect(plan.bounds)
+
+        # Both where the element was and where it is now need repainting
+        self._AddDirtyRect(elem.GetBounds())
+        self._AddDirtyRect(bounds)
+        elem.SetBounds(bounds)
+        self.SetIdBounds(wx_id, bounds)
 
+        # Elements stay in the place of the PDC they were first drawn in
+        if elem.GetDrawOrder() is None:
+            elem.SetDrawOrder(self._draw_count)
+            self._draw_count += 1
+        self._spatial_index.Insert(elem_id, bounds, elem.GetDrawOrder())
+
+    def CompileDrawPlan(self, elem, pseudo_id):
+        """ Resolves the styles and content of the element in the pseudo id 
+        into the drawing operations to replay. 
+
+        :returns: `DrawPlan`
+        """
         try:
-            styles_dict = copy.copy(elem.GetStyles(pseudo_id))
+            style = elem.GetCompiledStyles(pseudo_id)
         except KeyError:
             raise RuntimeError("Invalid psuedo selector, '{}'".format(pseudo_id))
 
         elem_type = elem.GetType()
         elem_content = elem.GetContent()
-
-        # Clean property values
-        for prop in styles_dict:
-            styles_dict[prop] = self.CleanProperty(styles_dict[prop])
+        ops = []
 
         # Define styles 
-        uiss_background_color = styles_dict["background-color"] 
-        uiss_color = styles_dict["color"] 
-        uiss_background = styles_dict["background"] 
-        uiss_border_radius = styles_dict["border-radius"] 
-        uiss_border_width = styles_dict["border-width"]
-        uiss_border_color = styles_dict["border-color"]
-        uiss_top = styles_dict["top"]
-        uiss_left = styles_dict["left"]
-        uiss_width = styles_dict["width"] 
-        uiss_height = styles_dict["height"] 
-        uiss_text_decoration = styles_dict["text-decoration"]
-        uiss_font_weight = styles_dict["font-weight"]
-        uiss_font_style = styles_dict["font-style"]
-        uiss_font_size = styles_dict["font-size"]
-        uiss_transform_rotate = styles_dict["transform-rotate"]
-        uiss_text_transform = styles_dict["text-transform"] 
-
-        # Set the rect of the element
-        elem.SetRect(wx.Rect(uiss_left, uiss_top, uiss_width, uiss_height))
+        uiss_border_radius = style.border_radius
+        uiss_top = style.top
+        uiss_left = style.left
+        uiss_width = style.width
+        uiss_height = style.height
+        uiss_transform_rotate = style.transform_rotate
+
+        # The rect of the element
+        rect = wx.Rect(uiss_left, uiss_top, uiss_width, uiss_height)
 
         # Draw
         if elem_type == "SHAPE":
 
             # Use styles
-            self.SetPen(wx.Pen(wx.Colour(uiss_border_color), uiss_border_width))
-            self.SetBrush(wx.Brush(wx.Colour(uiss_background_color), wx.SOLID))
+            ops.append((PseudoDC.SetPen, (style.pen,)))
+            ops.append((PseudoDC.SetBrush, (style.brush,)))
 
             if uiss_border_radius > 0:
                 if uiss_width == uiss_height and uiss_border_radius == uiss_height/2:
                     # Correct the coordinates so that the circle's "corner" is 
                     # placed at the uiss_top and uiss_left position
                     half = uiss_width/2
-                    self.DrawCircle(uiss_left+half, uiss_top+half, uiss_border_radius)
+                    ops.append((PseudoDC.DrawCircle, (uiss_left+half, uiss_top+half, uiss_border_radius)))
                 else:
-                    self.DrawRoundedRectangle(
+                    ops.append((PseudoDC.DrawRoundedRectangle, (
                         uiss_left, uiss_top, uiss_width, uiss_height, uiss_border_radius
-                        )
+                        )))
             else:
-                self.DrawRectangle(uiss_left, uiss_top, uiss_width, uiss_height)
+                ops.append((PseudoDC.DrawRectangle, (uiss_left, uiss_top, uiss_width, uiss_height)))
+
+            # The border is drawn centered on the outline
+            border = math.ceil(style.border_width)
+            bounds = GetRotatedBounds(uiss_left, uiss_top, uiss_width, uiss_height, 0)
+            bounds.Inflate(border, border)
 
 
         elif elem_type == "TEXT":
             text = elem_content
 
             # Use styles
-            fnt = self._parent_window.GetFont()
+            self.GetBaseFont()
+            font_args = (style.font_size, style.font_weight, style.font_style, style.underline)
+            fnt = self._fonts.GetFont(*font_args)
 
-            # Text decoration
-            if uiss_text_decoration == "underline":
-                fnt.MakeUnderlined()
+            ops.append((PseudoDC.SetFont, (fnt,)))
+            ops.append((PseudoDC.SetTextForeground, (style.color,)))
+            ops.append((PseudoDC.SetTextBackground, (style.background,)))
 
-            # Font size
-            if uiss_font_size == "medium":
-                pass
+            # Text transform
+            if style.text_transform is not None:
+                text = style.text_transform(text)
 
-            elif uiss_font_size == "smaller":
-                fnt.MakeSmaller()
+            if uiss_transform_rotate == 0:
+                ops.append((PseudoDC.DrawText, (text, uiss_left, uiss_top)))
+            else:
+                ops.append((PseudoDC.DrawRotatedText, (text, uiss_left, uiss_top, uiss_transform_rotate)))
 
-            elif uiss_font_size == "larger":
-                fnt.MakeLarger()
+            # The rect of text elements is the rect of the (rotated) 
+            # text, rather than the width and height styles
+            text_width, text_height = self._text_extents.GetTextExtent(
+                self._parent_window, self._fonts.GetFontKey(*font_args), fnt, text
+                )
+            bounds = GetRotatedBounds(
+                uiss_left, uiss_top, text_width, text_height, uiss_transform_rotate
+                )
+            rect = wx.Rect(bounds)
 
-            # Font weight
-            if uiss_font_weight in ["normal", "400"]:
-                fnt.SetWeight(wx.FONTWEIGHT_NORMAL)
 
-            elif uiss_font_weight in ["bold", "700"]:
-                fnt.SetWeight(wx.FONTWEIGHT_BOLD)
+        elif elem_type == "IMAGE":
+            img_path = elem_content
+
+            # Only positive rotations are applied to images
+            if uiss_transform_rotate > 0:
+                rotation = uiss_transform_rotate
+            else:
+                rotation = 0
 
-            elif uiss_font_weight == "100":
-                fnt.SetWeight(wx.FONTWEIGHT_THIN)
+            # The bitmap is looked up when the plan is replayed, rather 
+            # than kept by the plan, so that it can be evicted from the cache
+            center = wx.Point(uiss_left, uiss_top)
+            bitmap = self._bitmaps.GetBitmap(img_path, rotation, center)
+            ops.append((UIStylePDC._DrawCachedBitmap, (img_path, rotation, center, uiss_left, uiss_top)))
 
-            elif uiss_font_weight == "200":
-                fnt.SetWeight(wx.FONTWEIGHT_EXTRALIGHT)
+            # The bitmap is already rotated
+            bounds = wx.Rect(uiss_left, uiss_top, bitmap.GetWidth(), bitmap.GetHeight())
 
-            elif uiss_font_weight == "300":
-                fnt.SetWeight(wx.FONTWEIGHT_LIGHT)
+        # Retained mode: the operations are rendered once into a bitmap, 
+        # which is looked up when the plan is replayed (like the images)
+        if elem.GetCacheHint() and not bounds.IsEmpty():
+            key = (self._layer_namespace, elem.GetId(), elem.GetDrawState(pseudo_id))
+            ops = [(UIStylePDC._DrawLayer, (key, tuple(ops), wx.Rect(bounds)))]
 
-            elif uiss_font_weight == "500":
-                fnt.SetWeight(wx.FONTWEIGHT_MEDIUM)
+        return DrawPlan(ops, rect, bounds)
 
-            elif uiss_font_weight == "600":
-                fnt.SetWeight(wx.FONTWEIGHT_SEMIBOLD)
+    def _DrawCachedBitmap(self, img_path, rotation, center, x, y):
+        bitmap = self._bitmaps.GetBitmap(img_path, rotation, center)
+        self.DrawBitmap(bitmap, x, y, True)
 
-            elif uiss_font_weight == "800":
-                fnt.SetWeight(wx.FONTWEIGHT_EXTRABOLD)
+    def _DrawLayer(self, key, ops, bounds):
+        bitmap = GetLayerCache().GetLayer(key, self._RenderLayer, ops, bounds)
+        self.DrawBitmap(bitmap, bounds.x, bounds.y, True)
 
-            elif uiss_font_weight == "900":
-                fnt.SetWeight(wx.FONTWEIGHT_HEAVY)
+    def _RenderLayer(self, ops, bounds):
+        """ Render the drawing operations of a draw plan into a transparent bitmap of the size of the bounds. 
 
-            elif uiss_font_weight == "1000":
-                fnt.SetWeight(wx.FONTWEIGHT_EXTRAHEAVY)
+        For internal use only.
+        """
+        bitmap = wx.Bitmap.FromRGBA(bounds.width, bounds.height)
+        mem_dc = wx.MemoryDC(bitmap)
+        dc = wx.GCDC(mem_dc)
+        dc.SetDeviceOrigin(-bounds.x, -bounds.y)
+
+        for func, args in ops:
+            if func is UIStylePDC._DrawCachedBitmap:
+                img_path, rotation, center, x, y = args
+                dc.DrawBitmap(self._bitmaps.GetBitmap(img_path, rotation, center), x, y, True)
+            else:
+                # The same method of the DC as the PDC method
+                getattr(dc, func.__name__)(*args)
 
-            # Font style
-            if uiss_font_style == "normal":
-                fnt.SetStyle(wx.FONTSTYLE_NORMAL)
+        del dc
+        mem_dc.SelectObject(wx.NullBitmap)
+        return bitmap
 
-            elif uiss_font_style == "italic":
-                fnt.SetStyle(wx.FONTSTYLE_ITALIC)
 
-            self.SetFont(fnt)
-            self.SetTextForeground(wx.Colour(uiss_color))
-            self.SetTextBackground(wx.Colour(uiss_background))
+    def Batch(self):
+        """ Batch the element updates made inside of a ``with`` block. The
+        elements are queued instead of being drawn right away. If an element 
+        is updated more than once, only its last pseudo-id is drawn, and its 
+        styles are compiled and drawn once when the batch is committed.
 
-            # Text transform
-            if uiss_text_transform == "none":
-                text = text # Do nothing
+        Example:
 
-            if uiss_text_transform == "lowercase":
-                text = text.lower()
+        .. code-block::
 
-            elif uiss_text_transform == "uppercase":
-                text = text.upper()
+            >> with dc.Batch() as batch:
+            >>     dc.UpdateElem('button:hover')
+            >>     dc.UpdateElem('button-text:hover', styles="color: red;")
+            >> self.RefreshRect(batch.dirty_rect, False)
 
-            elif uiss_text_transform == "capitalize":
-                text = text.capitalize()
-            
+        :returns: `UpdateBatch` context manager, which has the dirty rect of the batch as ``dirty_rect`` once the block exits
+        """
+        return UpdateBatch(self)
 
-            if uiss_transform_rotate == 0:
-                self.DrawText(text, uiss_left, uiss_top)
-            else:
-                self.DrawRotatedText(text, uiss_left, uiss_top, uiss_transform_rotate)
+    def BeginBatch(self):
+        """ Start queueing element updates. Batches can be nested; the updates are drawn when the outermost batch is committed. See also: ``Batch`` """
+        self._batch_depth += 1
 
+    def CommitBatch(self):
+        """ Draw the element updates queued since ``BeginBatch``.
 
-        elif elem_type == "IMAGE":
-            img_path = elem_content
-            image = wx.Image(img_path)
+        :returns: `wx.Rect` of the area changed by the updates of this batch, which is also added to the dirty rect (see ``GetDirtyRect``). This is empty when committing an inner batch.
+        """
+        if self._batch_depth == 0:
+            raise RuntimeError("CommitBatch was called without calling BeginBatch first!")
 
-            #if uiss_height != 0 and uiss_width != 0:
-            #img_center = wx.Point(uiss_left+(image.GetWidth()/2), uiss_top+(image.GetHeight()/2))
-            #print(img_center)
-    
-            if uiss_transform_rotate > 0:
+        self._batch_depth -= 1
+        if self._batch_depth > 0:
+            return wx.Rect(0, 0, 0, 0)
 
-                image = wx.Image.Rotate(
-                    image, uiss_transform_rotate, wx.Point(uiss_left, uiss_top)
-                    )
+        queue = self._batch_queue
+        self._batch_queue = OrderedDict()
 
-            bitmap = wx.Image.ConvertToBitmap(image)
+        # Collect the area changed by this batch on its own
+        dirty_rect = self._dirty_rect
+        self._dirty_rect = wx.Rect(0, 0, 0, 0)
 
-            self.DrawBitmap(bitmap, uiss_left, uiss_top, True)
+        for elem_id, pseudo_id in queue.items():
+            elem = self._uisl_elements[elem_id]
+            elem.CompileStaleStyles()
+            if elem.GetDrawnState() != elem.GetDrawState(pseudo_id):
+                self.DrawElem(elem_id, pseudo_id)
 
+        batch_rect = self._dirty_rect
+        self._dirty_rect = dirty_rect
+        self._AddDirtyRect(batch_rect)
+        return wx.Rect(batch_rect)
+
+    def IsBatching(self):
+        """ Whether element updates are currently being queued. """
+        return self._batch_depth > 0
 
     def InitElem(self, id_statement, type_hint="SHAPE", content=""):
         """ Initilizes and draws the element with the same id selector and pseudo-id selector declared in the stylesheet. 
@@ -391,10 +1121,16 @@ class UIStylePDC(wx.adv.PseudoDC):
         See also: ``UpdateElem``
         """
         ids = self.LangParser.get_statement_ids(id_statement)
-        elem = self._uisl_elements[ids[0]]
+        self._InitElement(self._uisl_elements[ids[0]], ids[1], type_hint, content)
+
+    def _InitElement(self, elem, pseudo_id, type_hint, content):
         elem.SetType(type_hint)
         elem.SetContent(content)
-        self.DrawElem(ids[0], ids[1])
+
+        if self._batch_depth > 0:
+            self._batch_queue[elem.GetId()] = pseudo_id
+        else:
+            self.DrawElem(elem.GetId(), pseudo_id)
 
  
     def UpdateElem(self, id_statement, content="", styles=""):
@@ -417,12 +1153,64 @@ class UIStylePDC(wx.adv.PseudoDC):
         :param str id_statement: id selector and pseudo-id selector to draw (must be already declared in the intial stylesheet)
         :param str content: This could be either text or an image path to override the current text or image path to be drawn and displayed. This must agree with the `type_hint` value set in `InitElem`. 
         :param str styles: inline styles to update and override style properties of the element. Please note that inline styles WILL overwrite values declared in the intial stylesheet.
+        :returns: ``True`` if the element was redrawn, or ``False`` if it was already drawn in the same pseudo-id with the same content and styles (in which case there is no need to refresh the window). Inside of a batch, the element is only queued and ``None`` is returned.
         """
 
         ids = self.LangParser.get_statement_ids(id_statement)
-        new_styles = self.LangParser.parse_inline(styles)
-        #print("\n style ", new_styles)
-        elem = self._uisl_elements[ids[0]]
+        return self._UpdateElement(self._uisl_elements[ids[0]], ids[1], content, styles)
+
+    def _UpdateElement(self, elem, pseudo_id, content, styles):
         elem.SetContent(content)
-        elem.MergeStyles(ids[1], new_styles)
-        self.DrawElem(ids[0], ids[1])
+
+        if self._batch_depth > 0:
+            if styles:
+                elem.MergeStyles(pseudo_id, self.LangParser.parse_inline(styles), defer_compile=True)
+            self._batch_queue[elem.GetId()] = pseudo_id
+            return None
+
+        if styles:
+            elem.MergeStyles(pseudo_id, self.LangParser.parse_inline(styles))
+
+        # Nothing to do if the element is already drawn this way
+        if elem.IsDrawnAs(pseudo_id):
+            return False
+
+        self.DrawElem(elem.GetId(), pseudo_id)
+        return True
+
+    def GetHandle(self, id_statement):
+        """ Resolves the id selector and pseudo-id selector ahead of time, for 
+        ``Init`` and ``Update``. These skip parsing the id statement and 
+        looking up the element, which adds up on high-frequency updates 
+        (e.g: on mouse motion). Handles stay valid for the life of the PDC, 
+        including when the stylesheet is reloaded.
+
+        Example:
+
+        .. code-block::
+
+            >> self.button_hover = dc.GetHandle('button:hover')
+            >> ...
+            >> dc.Update(self.button_hover)
+
+        :param str id_statement: id selector and pseudo-id selector (must be already declared in the intial stylesheet)
+        :returns: `ElementHandle`
+        """
+        ids = self.LangParser.get_statement_ids(id_statement)
+        elem = self._uisl_elements[ids[0]]
+        if ids[1] not in elem.GetStyles():
+            raise RuntimeError("Invalid psuedo selector, '{}'".format(ids[1]))
+        return ElementHandle(elem, ids[1])
+
+    def Init(self, handle, type_hint="SHAPE", content=""):
+        """ The same as ``InitElem``, for an element handle. See: ``GetHandle`` """
+        self._InitElement(handle.element, handle.pseudo_id, type_hint, content)
+
+    def Update(self, handle, content="", styles=""):
+        """ The same as ``UpdateElem``, for an element handle. See: ``GetHandle``
+
+        When the element is already drawn this way, nothing is allocated.
+
+        :returns: ``True`` if the element was redrawn, ``False`` if it didn't need to be, or ``None`` inside of a batch
+        """
+        return self._UpdateElement(handle.element, handle.pseudo_id, content, styles)
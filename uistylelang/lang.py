@@ -25,14 +25,202 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
+import mmap
 import re
+from collections import OrderedDict
+from types import MappingProxyType
+
+from .utils import MapRawFile
+
+
+# Token specification of the UI Style Lang stylesheet language. Comments are
+# matched as tokens of their own so that they are skipped in the same pass
+# as everything else, rather than being removed from a copy of the text first.
+# A comment touching a token (e.g: "col/* x */or") would split it, so those 
+# texts still have their comments removed first (see: ``iter_piece_blocks``).
+TOKEN_SPECIFICATION = [
+    # Properties, along with their value when it directly follows
+    ('PROPERTY', r'(?P<PROPERTY_NAME>[A-Za-z0-9\-]+)(?:: (?P<PROPERTY_VALUE>[A-Za-z0-9#\.\-]+);)?'),
+    ('VALUE', r': [A-Za-z0-9#\.\-]+;'), # Property values
+    ('ID', r'@style [A-Za-z\-:]+'), #  Identifiers
+    ('IMPORT', r'@import "(?P<IMPORT_PATH>[^"\n*{}]*)";'), # Imported stylesheets
+    ('BEGIN', r'{'), # Statement begin
+    ('END', r'}'), # Statement terminator
+    ('COMMENT', r'/\*.*?\*/'), # Comments
+    ('MISMATCH', r'[^ \t\n]'), # Any other (invalid) character
+]
+
+def token_pattern(spaces, **patterns):
+    """ Joins the token specification into a single pattern, which skips 
+    the ``spaces`` characters before each token. The patterns given by 
+    name replace those of the specification, keeping the groups the same.
+    """
+    return r'[%s]*(?:' % spaces + '|'.join(
+        '(?P<%s>%s)' % (name, patterns.get(name, pattern))
+        for name, pattern in TOKEN_SPECIFICATION
+    ) + ')'
+
+# Compiled once at import. Spaces, tabs and line endings are skipped as 
+# part of the next token instead of being tokens of their own. No two 
+# tokens can match at the same position, so the order of the 
+# alternatives only matters for MISMATCH.
+TOKEN_REGEX = re.compile(token_pattern(r' \t\n'))
+
+# The same tokens over the bytes of a (memory-mapped) stylesheet file. Carriage 
+# returns are skipped too, since the file isn't read in text mode. The groups 
+# are the same, so the group indexes below are used for both.
+TOKEN_REGEX_BYTES = re.compile(
+    token_pattern(r' \t\r\n', MISMATCH=r'[^ \t\r\n]').encode("ascii")
+    )
+
+# The same tokens without comments, for text which had its comments removed 
+# already. Removing them can leave a new one behind (e.g: "//* x */*/"), 
+# which is then invalid, as it always was.
+STRIPPED_TOKEN_REGEX = re.compile(token_pattern(r' \t\n', COMMENT=r'(?!)'))
+STRIPPED_TOKEN_REGEX_BYTES = re.compile(
+    token_pattern(r' \t\r\n', MISMATCH=r'[^ \t\r\n]', COMMENT=r'(?!)').encode("ascii")
+    )
+
+# Approximate number of bytes tokenized at a time by ``iter_bytes_blocks``
+MAPPED_WINDOW_SIZE = 4 * 1024 * 1024
+
+# Group indexes of the tokens, compared against ``match.lastindex``
+_PROPERTY = TOKEN_REGEX.groupindex['PROPERTY']
+_PROPERTY_NAME = TOKEN_REGEX.groupindex['PROPERTY_NAME']
+_PROPERTY_VALUE = TOKEN_REGEX.groupindex['PROPERTY_VALUE']
+_VALUE = TOKEN_REGEX.groupindex['VALUE']
+_ID = TOKEN_REGEX.groupindex['ID']
+_IMPORT = TOKEN_REGEX.groupindex['IMPORT']
+_BEGIN = TOKEN_REGEX.groupindex['BEGIN']
+_END = TOKEN_REGEX.groupindex['END']
+_COMMENT = TOKEN_REGEX.groupindex['COMMENT']
+_MISMATCH = TOKEN_REGEX.groupindex['MISMATCH']
+
+# Comments, as removed by ``remove_comments``
+COMMENT_REGEX = re.compile(r'/\*.*?\*/')
+COMMENT_REGEX_BYTES = re.compile(rb'/\*.*?\*/')
+
+# Finds the start or end of a comment right next to anything other than a 
+# space, tab or line ending, i.e: where removing the comment would join 
+# two tokens (e.g: "col/* x */or" or "color:/* x */ red;"). Each branch 
+# starts with the comment delimiter, which is much faster to search for.
+TOUCHING_COMMENT_REGEX = re.compile(r'/\*(?<=[^ \t\n]/\*)|\*/(?=[^ \t\n])')
+TOUCHING_COMMENT_REGEX_BYTES = re.compile(rb'/\*(?<=[^ \t\r\n]/\*)|\*/(?=[^ \t\r\n])')
+
+# Finds the closing braces of the blocks (the group), skipping over comments
+BLOCK_END_REGEX = re.compile(r'/\*.*?\*/|(})')
+
+# Finds the start of a comment which isn't closed (the group), skipping 
+# over the comments which are
+OPEN_COMMENT_REGEX = re.compile(r'/\*.*?\*/|(/\*)')
+
+# Finds the paths of the imported stylesheets (the group), skipping over comments
+IMPORT_REGEX = re.compile(r'/\*.*?\*/|@import "([^"\n*{}]*)";')
+
+
+def common_prefix_length(a, b):
+    """ Length of the common prefix of the two strings. """
+    length = min(len(a), len(b))
+    step = 4096
+    i = 0
+    # Compare in chunks first, then narrow down
+    while i < length and a[i:i + step] == b[i:i + step]:
+        i += step
+    while i < length and a[i] == b[i]:
+        i += 1
+    return min(i, length)
+
+
+def common_suffix_length(a, b, max_length):
+    """ Length of the common suffix of the two strings, up to ``max_length``. """
+    len_a = len(a)
+    len_b = len(b)
+    step = 4096
+    i = 0
+    while (i + step <= max_length 
+           and a[len_a - i - step:len_a - i] == b[len_b - i - step:len_b - i]):
+        i += step
+    while i < max_length and a[len_a - i - 1] == b[len_b - i - 1]:
+        i += 1
+    return i
+
+
+def diff_parsed_data(old_parsed_data, parsed_data):
+    """ Compares two versions of the parsed data of a stylesheet. 
+
+    :returns: set of the ``(id, pseudo_id)`` blocks which were added, removed or changed
+    """
+    changed = set()
+    for style_id in set(old_parsed_data) | set(parsed_data):
+        old_pseudo_styles = old_parsed_data.get(style_id, {})
+        new_pseudo_styles = parsed_data.get(style_id, {})
+        for pseudo_id in set(old_pseudo_styles) | set(new_pseudo_styles):
+            if old_pseudo_styles.get(pseudo_id) != new_pseudo_styles.get(pseudo_id):
+                changed.add((style_id, pseudo_id))
+    return changed
+
+
+def clean_property(uiss_prop):
+    """ Cleans the given UI Style Lang property and 
+    converts it to the best type. Values that are not 
+    strings are taken to be cleaned already.
+    """
+    if not isinstance(uiss_prop, str):
+        cleaned_uiss_prop = uiss_prop
+    elif uiss_prop.endswith("px"):
+        # Remove the "px" on the end and 
+        # convert to the proper type.
+        if "." in uiss_prop:
+            cleaned_uiss_prop = float(uiss_prop[:-2])
+        else:
+            cleaned_uiss_prop = int(uiss_prop[:-2])
+
+    elif uiss_prop.endswith("deg"):
+        # Remove the "deg" on the end and 
+        # convert to the proper type.
+        cleaned_uiss_prop = float(uiss_prop[:-3]) # Must be a float!
+
+    else:
+        cleaned_uiss_prop = uiss_prop
+
+    return cleaned_uiss_prop
+
+class StyleBlock(object):
+    """ Source span of the stylesheet ending with the closing brace of
+    an ``@style`` block, along with the blocks tokenized from it. 
+    See: ``UIStyleLangParser.get_block_index``
+    """
+    __slots__ = ("start", "end", "text_hash", "blocks")
+
+    def __init__(self, start, end, text_hash, blocks):
+        self.start = start
+        self.end = end
+        self.text_hash = text_hash
+        self.blocks = blocks # list of (id, pseudo_id, properties)
 
 
 class UIStyleLangParser(object):
-    """ Core parser for the UI Style Lang stylesheet language. """
-    def __init__(self, uislang_str):
+    """ Core parser for the UI Style Lang stylesheet language. 
+
+    :param uislang_str: the stylesheet text
+    :param int inline_cache_size: maximum number of parsed inline style strings to keep. Set to ``0`` to disable the cache.
+    """
+    def __init__(self, uislang_str, inline_cache_size=128):
         self.uistylelang_str = uislang_str
 
+        # Parsed inline styles, most recently used last
+        self.inline_cache = OrderedDict()
+        self.inline_cache_size = inline_cache_size
+        self.inline_cache_hits = 0
+        self.inline_cache_misses = 0
+
+        # Source spans of the blocks, see parse_incremental
+        self.block_ends = None
+        self.block_hashes = None
+        self.block_results = None
+        self.block_parsed_data = None
+
     def get_lang_string(self):
         return self.uistylelang_str
 
@@ -60,9 +248,358 @@ class UIStyleLangParser(object):
         :param input_text: the raw input stylesheet code to remove comments from
         :returns: string of text without comments
         """
-        p = re.compile(r'/\*.*?\*/')
-        output_text = p.sub('', input_text)
-        return output_text
+        return COMMENT_REGEX.sub('', input_text)
+
+    def mismatch_error(self, uiss_styles, pos, line_offset=0, column_offset=0):
+        """ Creates the error for an unexpected character in the stylesheet.
+
+        The line and column are only worked out here, so that the
+        tokenizer doesn't need to keep count of the line endings. The 
+        column is counted without the comments, as if they had been 
+        removed before tokenizing.
+
+        :param int line_offset: number of lines before ``uiss_styles`` (when it is a piece of a stream)
+        :param int column_offset: number of characters of the line before ``uiss_styles``, without the comments
+        """
+        line_start = uiss_styles.rfind("\n", 0, pos) + 1
+        line_num = line_offset + uiss_styles.count("\n", 0, pos) + 1
+        column = len(self.remove_comments(uiss_styles[line_start:pos]))
+        if line_start == 0:
+            column += column_offset
+        value = uiss_styles[pos]
+        return RuntimeError(f'{value!r} unexpected on line {line_num}, column {column}')
+
+    def advance_offsets(self, uiss_styles, pos, line_offset, column_offset):
+        """ Moves the line and column offsets of ``uiss_styles`` (see: ``mismatch_error``) to the index ``pos`` in it.
+
+        :returns: tuple of the line and column offsets of ``uiss_styles[pos:]``
+        """
+        newlines = uiss_styles.count("\n", 0, pos)
+        column = len(self.remove_comments(uiss_styles[uiss_styles.rfind("\n", 0, pos) + 1:pos]))
+        if newlines:
+            return line_offset + newlines, column
+        return line_offset, column_offset + column
+
+    def iter_blocks(self, styles=None, pos=0, endpos=None):
+        """ Tokenizes the stylesheet in a single pass and yields each 
+        ``@style`` block as soon as its closing brace is reached.
+
+        :param styles: stylesheet text to tokenize. Defaults to the text given to the parser.
+        :param int pos: index in the text to start tokenizing at
+        :param int endpos: index in the text to stop tokenizing at. Defaults to the end of the text.
+        :returns: generator of ``(id, pseudo_id, properties)`` tuples. The properties are ``None`` for an ``@style`` id which is never closed, so that ``build_parsed_data`` still adds the id.
+        """
+        if styles is None:
+            styles = self.get_lang_string()
+        if endpos is None:
+            endpos = len(styles)
+        return self.iter_piece_blocks([(styles, pos, endpos, 0, 0)])
+
+    def iter_piece_blocks(self, pieces):
+        """ Tokenizes consecutive pieces of a stylesheet as if they were one 
+        text. Each piece must end on a token boundary (see ``iter_stream``).
+
+        A piece with a comment touching a token (e.g: ``col/* x */or``) has 
+        its comments removed before it is tokenized, as ``parse`` always 
+        did, so that the comment joins the two halves rather than 
+        splitting the token.
+
+        :param pieces: iterable of ``(text, pos, endpos, line_offset, column_offset)`` tuples, where the offsets are the position of the piece in the stylesheet (for errors)
+        :returns: generator of ``(id, pseudo_id, properties)`` tuples. See: ``iter_blocks``
+        """
+        style_id = None
+        style_pseudo_id = None
+        prop_dict = None
+        property_selector = None
+        closed = True
+
+        for styles, pos, endpos, line_offset, column_offset in pieces:
+            token_regex = TOKEN_REGEX
+            if TOUCHING_COMMENT_REGEX.search(styles, pos, endpos) is not None:
+                line_offset, column_offset = self.advance_offsets(
+                    styles, pos, line_offset, column_offset
+                    )
+                styles = self.remove_comments(styles[pos:endpos])
+                pos = 0
+                endpos = len(styles)
+                token_regex = STRIPPED_TOKEN_REGEX
+
+            for mo in token_regex.finditer(styles, pos, endpos):
+                kind = mo.lastindex
+
+                # Ordered by how often each token shows up
+                if kind == _PROPERTY:
+                    property_selector = mo.group(_PROPERTY_NAME)
+                    prop_dict[property_selector] = mo.group(_PROPERTY_VALUE)
+
+                elif kind == _VALUE:
+                    prop_dict[property_selector] = mo.group(_VALUE)[2:-1]
+
+                elif kind == _ID:
+                    if not closed:
+                        yield style_id, style_pseudo_id, None
+
+                    # Get the id and pseudo-id
+                    # ["example", "hover"]
+                    style_id_statement = mo.group(_ID)[7:]
+                    if style_id_statement.rfind(":") == -1:
+                        style_id = style_id_statement
+                        style_pseudo_id = "init" # Understood to be "init"
+                    else:
+                        style_ids = style_id_statement.rsplit(":")
+                        style_id = style_ids[0]
+                        style_pseudo_id = style_ids[1]
+
+                    prop_dict = {} # inner properties
+                    closed = False
+
+                elif kind == _END:
+                    yield style_id, style_pseudo_id, prop_dict
+                    closed = True
+
+                elif kind == _MISMATCH:
+                    raise self.mismatch_error(
+                        styles, mo.start(_MISMATCH), line_offset, column_offset
+                        )
+
+                # BEGIN, COMMENT and IMPORT tokens need no handling
+
+        if not closed:
+            yield style_id, style_pseudo_id, None
+
+    def mismatch_error_bytes(self, uiss_bytes, pos, line_offset=0):
+        """ Creates the error for an unexpected byte in the stylesheet bytes. See: ``mismatch_error`` """
+        line_start = uiss_bytes.rfind(b"\n", 0, pos) + 1
+        # mmap objects have no count method
+        line_num = line_offset + uiss_bytes[:pos].count(b"\n") + 1
+        column = len(self.remove_comments(uiss_bytes[line_start:pos].decode("utf-8", "replace")))
+        value = uiss_bytes[pos:pos + 4].decode("utf-8", "replace")[0]
+        return RuntimeError(f'{value!r} unexpected on line {line_num}, column {column}')
+
+    def iter_bytes_blocks(self, uiss_bytes, pos=0, endpos=None, release=None):
+        """ Tokenizes the UTF-8 bytes of a stylesheet (e.g: a memory-mapped 
+        file, see ``parse_file``) in a single pass, without decoding the 
+        whole text. Only the ids, properties and values are decoded, and 
+        each distinct property or value only once, so that the parsed styles 
+        share the strings.
+
+        :param uiss_bytes: bytes-like object of the stylesheet
+        :param int pos: index in the bytes to start tokenizing at
+        :param int endpos: index in the bytes to stop tokenizing at. Defaults to the end.
+        :param release: called with the start and end of each window of about ``MAPPED_WINDOW_SIZE`` bytes once it has been tokenized (e.g: to drop the pages of a mapped file)
+        :returns: generator of ``(id, pseudo_id, properties)`` tuples, the same as ``iter_blocks`` gives for the decoded text
+        """
+        if endpos is None:
+            endpos = len(uiss_bytes)
+
+        style_id = None
+        style_pseudo_id = None
+        prop_dict = None
+        property_selector = None
+        closed = True
+        decoded = {}
+
+        window_start = pos
+        while window_start < endpos:
+            # Tokens can't span lines, so the windows end on a line ending
+            window_end = uiss_bytes.find(b"\n", min(window_start + MAPPED_WINDOW_SIZE, endpos), endpos)
+            window_end = endpos if window_end == -1 else window_end + 1
+
+            # See: iter_piece_blocks
+            window = uiss_bytes
+            pos = window_start
+            window_endpos = window_end
+            token_regex = TOKEN_REGEX_BYTES
+            if TOUCHING_COMMENT_REGEX_BYTES.search(uiss_bytes, window_start, window_end) is not None:
+                window = COMMENT_REGEX_BYTES.sub(b'', uiss_bytes[window_start:window_end])
+                pos = 0
+                window_endpos = len(window)
+                token_regex = STRIPPED_TOKEN_REGEX_BYTES
+
+            for mo in token_regex.finditer(window, pos, window_endpos):
+                kind = mo.lastindex
+
+                # Ordered by how often each token shows up
+                if kind == _PROPERTY:
+                    name = mo.group(_PROPERTY_NAME)
+                    property_selector = decoded.get(name)
+                    if property_selector is None:
+                        property_selector = decoded[name] = name.decode("ascii")
+
+                    value = mo.group(_PROPERTY_VALUE)
+                    if value is not None:
+                        decoded_value = decoded.get(value)
+                        if decoded_value is None:
+                            decoded_value = decoded[value] = value.decode("ascii")
+                        value = decoded_value
+                    prop_dict[property_selector] = value
+
+                elif kind == _VALUE:
+                    value = mo.group(_VALUE)[2:-1]
+                    decoded_value = decoded.get(value)
+                    if decoded_value is None:
+                        decoded_value = decoded[value] = value.decode("ascii")
+                    prop_dict[property_selector] = decoded_value
+
+                elif kind == _ID:
+                    if not closed:
+                        yield style_id, style_pseudo_id, None
+
+                    style_id_statement = mo.group(_ID)[7:].decode("ascii")
+                    if style_id_statement.rfind(":") == -1:
+                        style_id = style_id_statement
+                        style_pseudo_id = "init" # Understood to be "init"
+                    else:
+                        style_ids = style_id_statement.rsplit(":")
+                        style_id = style_ids[0]
+                        style_pseudo_id = style_ids[1]
+
+                    prop_dict = {} # inner properties
+                    closed = False
+
+                elif kind == _END:
+                    yield style_id, style_pseudo_id, prop_dict
+                    closed = True
+
+                elif kind == _MISMATCH:
+                    if window is uiss_bytes:
+                        raise self.mismatch_error_bytes(uiss_bytes, mo.start(_MISMATCH))
+                    raise self.mismatch_error_bytes(
+                        window, mo.start(_MISMATCH), uiss_bytes[:window_start].count(b"\n")
+                        )
+
+                # BEGIN, COMMENT and IMPORT tokens need no handling
+
+            if release is not None:
+                release(window_start, window_end)
+            window_start = window_end
+
+        if not closed:
+            yield style_id, style_pseudo_id, None
+
+    def parse_bytes(self, uiss_bytes, release=None):
+        """ Parses the UTF-8 bytes of a stylesheet. See: ``iter_bytes_blocks``
+
+        :returns: the parsed data, in the same format as ``parse``
+        """
+        return self.build_parsed_data(self.iter_bytes_blocks(uiss_bytes, release=release))
+
+    def parse_file(self, path):
+        """ Parses a stylesheet file by memory-mapping it and tokenizing its 
+        bytes, so that the file is never read into memory as a whole or 
+        decoded. Where supported, the pages of the file are dropped from 
+        memory once they have been tokenized.
+
+        :param str path: path to the .uiss or .css stylesheet file
+        :returns: the parsed data, in the same format as ``parse``
+        """
+        with MapRawFile(path) as uiss_bytes:
+            if not (isinstance(uiss_bytes, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED")):
+                return self.parse_bytes(uiss_bytes)
+
+            uiss_bytes.madvise(mmap.MADV_SEQUENTIAL)
+
+            def release(start, end):
+                # Only whole pages can be dropped. They are read 
+                # from the file again if they are used later.
+                start -= start % mmap.PAGESIZE
+                end -= end % mmap.PAGESIZE
+                if end > start:
+                    uiss_bytes.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+            return self.parse_bytes(uiss_bytes, release)
+
+    def iter_stream(self, stream, chunk_size=65536):
+        """ Tokenizes a stylesheet from a text file object or an iterator of 
+        text chunks, yielding each ``@style`` block as soon as its closing 
+        brace is read. Only the text after the last complete line or block 
+        is held in memory, so the memory used is bounded by the largest 
+        block rather than by the size of the stylesheet.
+
+        Example:
+
+        .. code-block::
+
+            >> with open("styles.uiss") as stylesheet_file:
+            >>     for elem_id, pseudo_id, properties in parser.iter_stream(stylesheet_file):
+            >>         ...
+
+        :param stream: text file object (anything with a ``read`` method) or iterable of strings
+        :param int chunk_size: number of characters to read at a time from a file object
+        :returns: generator of ``(id, pseudo_id, properties)`` tuples, the same as ``iter_blocks`` would give for the whole text
+        """
+        return self.iter_piece_blocks(self.iter_stream_pieces(stream, chunk_size))
+
+    def iter_stream_pieces(self, stream, chunk_size=65536):
+        """ Splits the text of the stream into pieces which end on token 
+        boundaries, for ``iter_piece_blocks``.
+
+        Tokens can't span lines (comments included) or closing braces, so a 
+        piece ends at the last line ending or closing brace read so far. A 
+        closing brace after the first unclosed ``/*`` of the last line is 
+        not used, since the rest of the line might make it part of a 
+        comment.
+        """
+        if hasattr(stream, "read"):
+            chunks = iter(lambda: stream.read(chunk_size), "")
+        else:
+            chunks = stream
+
+        pending = []
+        line_offset = 0
+        column_offset = 0
+
+        for chunk in chunks:
+            pending.append(chunk)
+            if "\n" not in chunk and "}" not in chunk:
+                continue
+
+            buffer = "".join(pending)
+            cut = buffer.rfind("\n") + 1
+
+            # Also cut after the last closing brace of the last line
+            # which is before any comment that isn't closed yet
+            limit = len(buffer)
+            for mo in OPEN_COMMENT_REGEX.finditer(buffer, cut):
+                if mo.lastindex:
+                    limit = mo.start()
+                    break
+            for end in self.find_block_ends(buffer, cut, limit):
+                cut = end
+
+            if cut == 0:
+                pending = [buffer]
+                continue
+
+            yield buffer, 0, cut, line_offset, column_offset
+
+            line_offset, column_offset = self.advance_offsets(
+                buffer, cut, line_offset, column_offset
+                )
+            pending = [buffer[cut:]]
+
+        buffer = "".join(pending)
+        if buffer:
+            yield buffer, 0, len(buffer), line_offset, column_offset
+
+    def parse_stream(self, stream, chunk_size=65536):
+        """ Parses a stylesheet from a text file object or an iterator of 
+        text chunks. See: ``iter_stream``
+
+        :returns: the parsed data, in the same format as ``parse``
+        """
+        return self.build_parsed_data(self.iter_stream(stream, chunk_size))
+
+    def find_imports(self, styles=None):
+        """ Finds the ``@import "file.uiss";`` statements of the stylesheet.
+        The imports are resolved by the ``StyleSheetRegistry``; the parser 
+        itself skips over them.
+
+        :returns: list of the imported paths, as they are written, in order
+        """
+        if styles is None:
+            styles = self.get_lang_string()
+        return [mo.group(1) for mo in IMPORT_REGEX.finditer(styles) if mo.lastindex]
 
     def parse(self, styles="", inline=False):
         """ Parses the UI Style Language text and formats the data into a dictionary.
@@ -82,107 +619,235 @@ class UIStyleLangParser(object):
                 }
             }
         """
-        parsed_data = {}
+        if inline == True:
+            return self.parse_inline_tokens(styles)
 
-        if inline == False:
-            uiss_styles = self.remove_comments(self.get_lang_string())
-        else:
-            # We don't remove comments from inline styles -there shouldn't be any!
-            uiss_styles = styles
-
-        token_specification = [
-            ('ID', r'@style [A-Za-z\-:]+'), #  Identifiers
-            ('BEGIN', r'{'), # Statement begin
-            ('PROPERTY', r'[A-Za-z0-9\-]+'), # Properties
-            ('VALUE', r': [A-Za-z0-9#\.\-]+;'), # Property values
-            ('END', r'}'), # Statement terminator
-            ('NEWLINE', r'\n'), # Line endings
-            ('SKIP', r'[ \t]+'), # Skip over spaces and tabs
-            ('MISMATCH', r'.'), # Any other (invalid) character
-        ]
-        
-        tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
-        line_num = 1
-        line_start = 0
+        return self.build_parsed_data(self.iter_blocks())
 
+    def build_parsed_data(self, blocks):
+        """ Formats the ``(id, pseudo_id, properties)`` blocks into the dictionary returned by ``parse``. """
+        parsed_data = {}
         last_id = None
-        new_block = True
-  
-        for mo in re.finditer(tok_regex, uiss_styles):
-            kind = mo.lastgroup
-            value = mo.group()
-            column = mo.start() - line_start
-
-            if kind == "NEWLINE":
-                line_start = mo.end()
-                line_num += 1
-                continue
-            elif kind == "SKIP":
-                continue
-            elif kind == "MISMATCH":
-                raise RuntimeError(f'{value!r} unexpected on line {line_num}, column {column}')
 
-            elif kind == "BEGIN":
-                pass
- 
-            elif kind == "ID":
-                if inline == False:
-                    # Get the id
-                    style_id_statement = value[7:]
+        for style_id, style_pseudo_id, prop_dict in blocks:
+            # A new id starts a new set of pseudo-ids, even if
+            # the id was already declared earlier in the stylesheet.
+            if style_id != last_id:
+                last_id = style_id
+                parsed_data[style_id] = {}
 
-                    # Get the id and pseudo-id
-                    # ["example", "hover"]
-                    if style_id_statement.rfind(":") == -1:
-                        style_id = style_id_statement
-                        style_pseudo_id = "init" # Understood to be "init"
-                    else:
-                        style_ids = style_id_statement.rsplit(":")
-                        style_id = style_ids[0]
-                        style_pseudo_id = style_ids[1]
-
-                    current_block = [style_id, style_pseudo_id]
-
-                    if style_id != last_id:
-                        new_block = True
-                    if new_block == True:
-                        new_block = False
-                        last_id = style_id
-                        parsed_data[style_id] = {}
+            # An id which is never closed has no properties
+            if prop_dict is not None:
+                parsed_data[style_id][style_pseudo_id] = prop_dict
 
+        return parsed_data
 
-                    prop_dict = {} # inner properties
+    def find_block_ends(self, styles, pos=0, endpos=None):
+        """ Finds the end of each ``@style`` block (just after its closing 
+        brace) in the stylesheet, skipping over comments. 
 
+        :returns: list of indexes in the text
+        """
+        if endpos is None:
+            endpos = len(styles)
+        return [mo.end() for mo in BLOCK_END_REGEX.finditer(styles, pos, endpos) if mo.lastindex]
 
- 
-            elif kind == "PROPERTY":
-                if inline == False:
-                    property_selector = value
-                    prop_dict[str(property_selector)] = None
+    def tokenize_span(self, styles, start, end):
+        """ Tokenizes the source span of a block on its own. 
 
-                else:
-                    property_selector = value
-                    parsed_data[str(property_selector)] = None
+        :returns: list of ``(id, pseudo_id, properties)`` blocks, or ``None`` if the span doesn't start with an ``@style`` id (e.g: a stray closing brace), in which case it depends on the blocks before it and can't be tokenized on its own.
+        """
+        for mo in TOKEN_REGEX.finditer(styles, start, end):
+            kind = mo.lastindex
+            if kind == _ID:
+                break
+            elif kind != _BEGIN and kind != _COMMENT and kind != _IMPORT:
+                return None
+        return list(self.iter_blocks(styles, start, end))
+
+    def index_blocks(self, styles):
+        """ Records the source span, content hash and tokenized blocks of 
+        each ``@style`` block of the stylesheet for ``parse_incremental``. 
+        Each span runs from the end of the previous block up to and 
+        including the closing brace of the block (any text after the last 
+        block is a span of its own).
+
+        :returns: whether the stylesheet could be indexed. It can't if a span doesn't start with an ``@style`` id (see ``tokenize_span``).
+        """
+        ends = self.find_block_ends(styles)
+        if not ends or ends[-1] != len(styles):
+            ends.append(len(styles))
+
+        hashes = []
+        results = []
+        start = 0
+        for end in ends:
+            blocks = self.tokenize_span(styles, start, end)
+            if blocks is None:
+                # Can't be parsed block by block
+                self.block_ends = None
+                return False
+            hashes.append(hash(styles[start:end]))
+            results.append(blocks)
+            start = end
+
+        self.block_ends = ends
+        self.block_hashes = hashes
+        self.block_results = results
+        self.block_parsed_data = self.build_parsed_data(
+            block for blocks in results for block in blocks
+            )
+        return True
+
+    def get_block_index(self):
+        """ Get the source spans of the ``@style`` blocks recorded by the last 
+        call to ``parse_incremental``.
+
+        :returns: list of ``StyleBlock``, which is empty if the stylesheet can't be indexed
+        """
+        if self.block_ends is None and not self.index_blocks(self.get_lang_string()):
+            return []
+
+        index = []
+        start = 0
+        for end, text_hash, blocks in zip(self.block_ends, self.block_hashes, self.block_results):
+            index.append(StyleBlock(start, end, text_hash, blocks))
+            start = end
+        return index
+
+    def parse_incremental(self, new_styles):
+        """ Parses the edited stylesheet text, only tokenizing the ``@style`` 
+        blocks whose text changed since the text given to the parser (or the 
+        text of the last call), and replaces the text of the parser with it.
+
+        The blocks before the first and after the last changed line are 
+        reused as they are. Comments can't span lines, so those blocks can't 
+        be affected by the edit. The blocks in between (e.g: when two blocks 
+        far apart were edited) are split again, and each one whose text has 
+        the same content hash and text as a block of the old text is reused 
+        rather than tokenized.
+
+        :param new_styles: the new stylesheet text
+        :returns: tuple of the parsed data (as returned by ``parse``) and the set of ``(id, pseudo_id)`` blocks which were added, removed or changed
+        """
+        old_styles = self.get_lang_string()
+        if self.block_ends is None and not self.index_blocks(old_styles):
+            return self.parse_full_diff(new_styles, self.parse())
+
+        if new_styles == old_styles:
+            return self.block_parsed_data, set()
+
+        old_ends = self.block_ends
+        delta = len(new_styles) - len(old_styles)
+
+        # Find the changed region
+        prefix = common_prefix_length(old_styles, new_styles)
+        suffix = common_suffix_length(old_styles, new_styles, 
+                                      min(len(old_styles), len(new_styles)) - prefix)
+
+        # Blocks ending before the line of the first change are reused as is
+        line_start = new_styles.rfind("\n", 0, prefix) + 1
+        first = bisect.bisect_right(old_ends, line_start)
+        pos = old_ends[first - 1] if first > 0 else 0
+
+        # Blocks starting after the line of the last change are reused, moved by delta
+        line_end = new_styles.find("\n", len(new_styles) - suffix)
+        if line_end == -1:
+            last = len(old_ends) - 1
+        else:
+            last = max(bisect.bisect_right(old_ends, line_end - delta), first)
+            last = min(last, len(old_ends) - 1)
+        endpos = old_ends[last] + delta
+
+        # Only tokenize the blocks in between
+        mid_ends = self.find_block_ends(new_styles, pos, endpos)
+        if not mid_ends or mid_ends[-1] != endpos:
+            mid_ends.append(endpos)
+
+        # The old blocks in between, by their content hash
+        old_spans = {}
+        old_start = old_ends[first - 1] if first > 0 else 0
+        for i in range(first, last + 1):
+            old_spans.setdefault(self.block_hashes[i], (old_start, old_ends[i], i))
+            old_start = old_ends[i]
+
+        mid_hashes = []
+        mid_results = []
+        start = pos
+        for end in mid_ends:
+            text = new_styles[start:end]
+            text_hash = hash(text)
+            old_span = old_spans.get(text_hash)
+            if old_span is not None and old_styles[old_span[0]:old_span[1]] == text:
+                # Unchanged block, e.g: between two edits
+                blocks = self.block_results[old_span[2]]
+            else:
+                blocks = self.tokenize_span(new_styles, start, end)
+                if blocks is None:
+                    return self.parse_full_diff(new_styles, self.block_parsed_data)
+            mid_hashes.append(text_hash)
+            mid_results.append(blocks)
+            start = end
+
+        ends = old_ends[:first] + mid_ends + [end + delta for end in old_ends[last + 1:]]
+        hashes = self.block_hashes[:first] + mid_hashes + self.block_hashes[last + 1:]
+        results = self.block_results[:first] + mid_results + self.block_results[last + 1:]
+
+        parsed_data = self.build_parsed_data(
+            block for blocks in results for block in blocks
+            )
+
+        # Only the ids of the replaced blocks can have changed
+        affected_ids = set()
+        for blocks in self.block_results[first:last + 1] + mid_results:
+            for block in blocks:
+                affected_ids.add(block[0])
+
+        changed = set()
+        old_parsed_data = self.block_parsed_data
+        for style_id in affected_ids:
+            old_pseudo_styles = old_parsed_data.get(style_id, {})
+            new_pseudo_styles = parsed_data.get(style_id, {})
+            for pseudo_id in set(old_pseudo_styles) | set(new_pseudo_styles):
+                old_prop_dict = old_pseudo_styles.get(pseudo_id)
+                new_prop_dict = new_pseudo_styles.get(pseudo_id)
+                if old_prop_dict is not new_prop_dict and old_prop_dict != new_prop_dict:
+                    changed.add((style_id, pseudo_id))
+
+        self.uistylelang_str = new_styles
+        self.block_ends = ends
+        self.block_hashes = hashes
+        self.block_results = results
+        self.block_parsed_data = parsed_data
+        return parsed_data, changed
+
+    def parse_full_diff(self, new_styles, old_parsed_data):
+        """ Fallback of ``parse_incremental`` for stylesheets which can't be parsed block by block. """
+        parsed_data = self.build_parsed_data(self.iter_blocks(new_styles))
+        self.uistylelang_str = new_styles
+        self.index_blocks(new_styles)
+
+        return parsed_data, diff_parsed_data(old_parsed_data, parsed_data)
+
+    def parse_inline_tokens(self, styles):
+        """ Tokenizes inline styles into a flat dictionary of properties. """
+        parsed_data = {}
+        property_selector = None
 
-            elif kind == "VALUE":
-                if inline == False:
-                    property_val = value[2:][:-1]
-                    prop_dict[str(property_selector)] = property_val
-                else:
-                    property_val = value[2:][:-1]
-                    parsed_data[str(property_selector)] = property_val
+        for mo in TOKEN_REGEX.finditer(styles):
+            kind = mo.lastindex
 
-            elif kind == "END":
-                if inline == False:
-                    #parsed_data[style_id] = prop_dict
-                    parsed_data[current_block[0]][current_block[1]] = prop_dict
-                    #parsed_data[current_block[0]]["elem_type"] = {}
-                    
+            if kind == _PROPERTY:
+                property_selector = mo.group(_PROPERTY_NAME)
+                parsed_data[property_selector] = mo.group(_PROPERTY_VALUE)
 
-            #print(kind, value, "\n")
+            elif kind == _VALUE:
+                parsed_data[property_selector] = mo.group(_VALUE)[2:-1]
 
-        
+            elif kind == _MISMATCH or kind == _COMMENT:
+                # Comments aren't allowed in inline styles
+                raise self.mismatch_error(styles, mo.start(kind))
 
-        #print(self.set_elem_types(parsed_data), " final")
         return parsed_data
 
 
@@ -213,36 +878,62 @@ class UIStyleLangParser(object):
                 "border-color (PROPERTY)": "red (VALUE)",
             }
 
+        Results are kept in a bounded LRU cache, since the same inline
+        styles tend to be applied over and over again (e.g: on mouse 
+        motion). The returned mapping is read-only as it is shared 
+        between calls.
         """
-        return self.parse(styles, inline=True)
+        try:
+            parsed_data = self.inline_cache[styles]
+        except KeyError:
+            pass
+        else:
+            self.inline_cache_hits += 1
+            self.inline_cache.move_to_end(styles)
+            return parsed_data
 
+        self.inline_cache_misses += 1
+        parsed_data = MappingProxyType(self.parse(styles, inline=True))
 
-    def clean_property(self, uiss_prop):
-        """ Cleans the given UI Style Lang property and 
-        converts it to the best type.
+        if self.inline_cache_size > 0:
+            self.inline_cache[styles] = parsed_data
+            if len(self.inline_cache) > self.inline_cache_size:
+                self.inline_cache.popitem(last=False)
+
+        return parsed_data
+
+    def set_inline_cache_size(self, size):
+        """ Sets the maximum number of parsed inline style strings to keep,
+        evicting the least recently used ones if needed. 
         """
-        if uiss_prop == type(int):
-            cleaned_uiss_prop = uiss_prop
-        elif uiss_prop.endswith("px"):
-            # Remove the "px" on the end and 
-            # convert to the proper type.
-            if "." in uiss_prop:
-                cleaned_uiss_prop = float(uiss_prop[:-2])
-            else:
-                cleaned_uiss_prop = int(uiss_prop[:-2])
+        self.inline_cache_size = size
+        while len(self.inline_cache) > max(size, 0):
+            self.inline_cache.popitem(last=False)
 
-        elif uiss_prop.endswith("deg"):
-            # Remove the "deg" on the end and 
-            # convert to the proper type.
-            cleaned_uiss_prop = float(uiss_prop[:-3]) # Must be a float!
+    def get_inline_cache_info(self):
+        """ Returns the statistics of the inline styles cache.
 
-        else:
-            cleaned_uiss_prop = uiss_prop
+        :returns: dictionary with the ``hits``, ``misses``, ``size`` and ``max_size`` of the cache
+        """
+        return {
+            "hits": self.inline_cache_hits,
+            "misses": self.inline_cache_misses,
+            "size": len(self.inline_cache),
+            "max_size": self.inline_cache_size,
+        }
 
-        return cleaned_uiss_prop
+    def clear_inline_cache(self):
+        """ Empties the inline styles cache and resets its statistics. """
+        self.inline_cache.clear()
+        self.inline_cache_hits = 0
+        self.inline_cache_misses = 0
 
 
-  
+    def clean_property(self, uiss_prop):
+        """ Cleans the given UI Style Lang property and 
+        converts it to the best type.
+        """
+        return clean_property(uiss_prop)
 
 
 if __name__ == "__main__":
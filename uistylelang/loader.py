@@ -0,0 +1,141 @@
+# UI Style Lang Copyright 2020-2023 Noah Rahm
+
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+
+#     1. Redistributions of source code must retain the above copyright notice, 
+#        this list of conditions and the following disclaimer.
+    
+#     2. Redistributions in binary form must reproduce the above copyright 
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+
+#     3. The names of Noah Rahm, Correct Syntax and any contributers may not be 
+#        used to endorse or promote products derived from this software without 
+#        specific prior written permission.  
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Background loading of stylesheets
+# For consistency with the wxPython methods, title-case is used in this file
+
+# Stylesheets are read and parsed by a worker pool, so that the UI thread
+# (e.g: a splash screen) isn't blocked. The result is a ``StyleSheet``,
+# which can be passed to ``UIStyleApp`` or ``UIStylePDC`` in place of the
+# path of the stylesheet. The default pool is a thread pool: the parser is
+# pure Python and holds the GIL, so the stylesheets are parsed one at a
+# time (only reading the files overlaps). Pass a ``ProcessPoolExecutor``
+# to parse them on several CPUs.
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+from .registry import StyleSheet, GetStyleSheetRegistry, ReadStyleSheetData
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def GetLoaderExecutor():
+    """ Get the thread pool which stylesheets are loaded in by default. It keeps the UI thread free, but doesn't parse on more than one CPU at a time. """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1),
+                thread_name_prefix="UIStyleLangLoader"
+                )
+        return _executor
+
+
+def LoadStyleSheetFuture(file, executor=None):
+    """ Read and parse the stylesheet, and its imports, in the background. 
+    Stylesheets already in the registry are not loaded again.
+
+    Example:
+
+    .. code-block::
+
+        >> future = LoadStyleSheetFuture("styles.uiss")
+        >> ...
+        >> pdc = UIStylePDC(self, future.result())
+
+    :param file: path to the stylesheet or string with the comment-header
+    :param executor: ``concurrent.futures`` executor to read and parse in. Defaults to a shared thread pool (see: ``GetLoaderExecutor``). A ``ProcessPoolExecutor`` can also be given, since only plain data is passed to the workers. The parsed styles are pickled back though, so it only pays off for very large stylesheets (and the compiled cache is not used by the worker processes unless they enable it). Use the ``"spawn"`` start method in wxPython apps, rather than forking the process.
+    :returns: ``concurrent.futures.Future`` of the `StyleSheet`, which is added to the registry
+    """
+    future = concurrent.futures.Future()
+
+    registry = GetStyleSheetRegistry()
+    stylesheet = registry.Lookup(file)
+    if stylesheet is not None and not stylesheet.GetImports():
+        future.set_running_or_notify_cancel()
+        future.set_result(stylesheet)
+        return future
+
+    if executor is None:
+        executor = GetLoaderExecutor()
+    work = executor.submit(ReadStyleSheetData, file)
+
+    def OnLoaded(work):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            stylesheet = registry.GetStyleSheet(StyleSheet(*work.result()))
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(stylesheet)
+
+    work.add_done_callback(OnLoaded)
+    future.add_done_callback(lambda future: work.cancel() if future.cancelled() else None)
+    return future
+
+
+def LoadStyleSheetsFuture(files, executor=None):
+    """ Read and parse the stylesheets in the background. See: ``LoadStyleSheetFuture``
+
+    With the default thread pool, reading the files overlaps, but the 
+    stylesheets are parsed one at a time, since the parser holds the GIL. 
+    Pass a ``ProcessPoolExecutor`` to parse them on several CPUs.
+
+    :returns: list of ``concurrent.futures.Future`` of each `StyleSheet`, in the same order as the files
+    """
+    return [LoadStyleSheetFuture(file, executor) for file in files]
+
+
+async def LoadStyleSheetAsync(file, executor=None):
+    """ Awaitable version of ``LoadStyleSheetFuture``. 
+
+    Example:
+
+    .. code-block::
+
+        >> stylesheet = await LoadStyleSheetAsync("styles.uiss")
+
+    :returns: the `StyleSheet`
+    """
+    return await asyncio.wrap_future(LoadStyleSheetFuture(file, executor))
+
+
+async def LoadStyleSheetsAsync(files, executor=None):
+    """ Awaitable version of ``LoadStyleSheetsFuture``.
+
+    :returns: list of the `StyleSheet` of each file, in the same order as the files
+    """
+    return await asyncio.gather(*(
+        asyncio.wrap_future(future) for future in LoadStyleSheetsFuture(files, executor)
+        ))
@@ -0,0 +1,410 @@
+# UI Style Lang Copyright 2020-2023 Noah Rahm
+
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+
+#     1. Redistributions of source code must retain the above copyright notice, 
+#        this list of conditions and the following disclaimer.
+    
+#     2. Redistributions in binary form must reproduce the above copyright 
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+
+#     3. The names of Noah Rahm, Correct Syntax and any contributers may not be 
+#        used to endorse or promote products derived from this software without 
+#        specific prior written permission.  
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Process-wide registry of parsed stylesheets
+# For consistency with the wxPython methods, title-case is used in this file
+
+import concurrent.futures
+import hashlib
+import os
+import threading
+from types import MappingProxyType
+
+from .cache import LoadCompiledStyleSheet, SaveCompiledStyleSheet
+from .lang import UIStyleLangParser
+from .utils import ReadRawFile, IsStyleSheetString
+
+
+def FreezeParsedStyles(parsed_styles):
+    """ Get a read-only view of the parsed styles (ids, pseudo-ids and properties), 
+    so that it can be shared without being changed by accident. 
+    """
+    return MappingProxyType({
+        elem_id: MappingProxyType({
+            pseudo_id: MappingProxyType(properties)
+            for pseudo_id, properties in pseudo_styles.items()
+        })
+        for elem_id, pseudo_styles in parsed_styles.items()
+    })
+
+
+def GetStyleSheetKey(file):
+    """ Get the key of the stylesheet file or string in the registry. 
+
+    :returns: tuple of ``(key, path)``, where the path is ``None`` for strings
+    """
+    if IsStyleSheetString(file):
+        return ("string", hashlib.sha1(file.encode("utf-8")).hexdigest()), None
+
+    path = os.path.realpath(file)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # Let ReadRawFile report the problem
+        return ("file", path, None, None), path
+    return ("file", path, stat.st_mtime_ns, stat.st_size), path
+
+
+def ResolveImportPath(import_path, path):
+    """ Get the resolved path of an imported stylesheet. 
+
+    :param str import_path: the path in the ``@import`` statement
+    :param str path: the path of the importing stylesheet file. Imports of strings are relative to the current directory.
+    """
+    base_dir = os.path.dirname(path) if path is not None else os.getcwd()
+    return os.path.realpath(os.path.join(base_dir, import_path))
+
+
+def MergeImportedStyles(parsed_styles_list):
+    """ Merge the parsed styles of stylesheets, in order. The properties of 
+    later stylesheets override the same properties of earlier ones; the 
+    other properties are kept.
+
+    :param parsed_styles_list: list of parsed styles (see ``UIStyleLangParser.parse``), which may be read-only (see ``FreezeParsedStyles``)
+    :returns: the merged parsed styles, as plain dicts
+    """
+    merged_styles = {}
+    for parsed_styles in parsed_styles_list:
+        for elem_id, pseudo_styles in parsed_styles.items():
+            merged_pseudo_styles = merged_styles.setdefault(elem_id, {})
+            for pseudo_id, properties in pseudo_styles.items():
+                merged_properties = merged_pseudo_styles.get(pseudo_id)
+                if merged_properties is None:
+                    merged_pseudo_styles[pseudo_id] = dict(properties)
+                else:
+                    merged_properties.update(properties)
+    return merged_styles
+
+
+def ReadStyleSheetData(file):
+    """ Read and parse the stylesheet (or load it from the compiled cache, 
+    if it is enabled and fresh). Only plain data is used, so that this can 
+    run in a worker thread or process. 
+
+    :param file: path to the stylesheet or string with the comment-header
+    :returns: tuple of the arguments of ``StyleSheet``
+    """
+    key, path = GetStyleSheetKey(file)
+    raw_stylesheet = ReadRawFile(file)
+    lang_parser = UIStyleLangParser(raw_stylesheet)
+
+    parsed_styles = LoadCompiledStyleSheet(path, raw_stylesheet)
+    if parsed_styles is not None:
+        return GetStyleSheetData(raw_stylesheet, parsed_styles, key, path, lang_parser, save=False)
+    return GetStyleSheetData(raw_stylesheet, lang_parser.parse(), key, path, lang_parser)
+
+
+def ReloadStyleSheetData(file, lang_parser):
+    """ Read the stylesheet file again and parse it with ``parse_incremental`` 
+    (e.g: when it was edited). See: ``ReadStyleSheetData``
+
+    :param file: path to the stylesheet
+    :param lang_parser: ``UIStyleLangParser`` of the previous version of the stylesheet. Its text is replaced with the new one.
+    :returns: tuple of the arguments of ``StyleSheet`` and the set of ``(id, pseudo_id)`` blocks which changed
+    """
+    key, path = GetStyleSheetKey(file)
+    raw_stylesheet = ReadRawFile(file)
+    parsed_styles, changed = lang_parser.parse_incremental(raw_stylesheet)
+    return GetStyleSheetData(raw_stylesheet, parsed_styles, key, path, lang_parser), changed
+
+
+def GetStyleSheetData(raw_stylesheet, parsed_styles, key, path, lang_parser, save=True):
+    """ Write the parsed stylesheet to the compiled cache (if it is enabled) 
+    and find the stylesheets it imports.
+
+    :param lang_parser: ``UIStyleLangParser`` of the stylesheet text
+    :param bool save: whether to write the compiled cache
+    :returns: tuple of the arguments of ``StyleSheet``
+    """
+    if save == True:
+        SaveCompiledStyleSheet(path, raw_stylesheet, parsed_styles)
+
+    imports = [ResolveImportPath(import_path, path) 
+               for import_path in lang_parser.find_imports()]
+
+    return raw_stylesheet, parsed_styles, key, path, imports
+
+
+class StyleSheet(object):
+    """ A stylesheet which has been read and parsed. It is immutable, so that 
+    it can be shared by any number of ``UIStyleApp`` and ``UIStylePDC`` instances.
+
+    :param str raw_stylesheet: the stylesheet text
+    :param parsed_styles: the parsed styles (see ``UIStyleLangParser.parse``)
+    :param key: key of the stylesheet in the registry
+    :param str path: resolved path of the stylesheet file, or ``None`` for strings
+    :param imports: resolved paths of the stylesheets imported by this one, in order
+    :param files: paths of all of the stylesheet files the parsed styles come from. Defaults to just this one.
+    :param fragment: the stylesheet on its own, if this one has the styles of its imports merged in (see: ``StyleSheetRegistry.ResolveImports``)
+    """
+    def __init__(self, raw_stylesheet, parsed_styles, key, path=None, imports=(), files=None, 
+                 fragment=None):
+        self._raw_stylesheet = raw_stylesheet
+        self._parsed_styles = FreezeParsedStyles(parsed_styles)
+        self._key = key
+        self._path = path
+        self._imports = tuple(imports)
+        if files is None:
+            files = (path,) if path is not None else ()
+        self._files = tuple(files)
+        self._fragment = fragment
+
+    def GetRawStyleSheet(self):
+        return self._raw_stylesheet
+
+    @property
+    def ParsedStyles(self):
+        return self._parsed_styles
+
+    def GetKey(self):
+        return self._key
+
+    def GetPath(self):
+        return self._path
+
+    def GetImports(self):
+        """ Get the resolved paths of the stylesheets imported by this one. """
+        return self._imports
+
+    def GetFragment(self):
+        """ Get the stylesheet on its own, without the styles of its imports. This is the stylesheet itself if its imports are not resolved. """
+        if self._fragment is None:
+            return self
+        return self._fragment
+
+    def GetFiles(self):
+        """ Get the paths of all of the files the styles come from, including the imported ones. """
+        return self._files
+
+    def GetSource(self):
+        """ Get the path of the stylesheet file, or the stylesheet text for strings. """
+        if self._path is None:
+            return self._raw_stylesheet
+        return self._path
+
+
+class StyleSheetRegistry(object):
+    """ Registry of the parsed stylesheets of the process, so that each 
+    stylesheet is only read and parsed once no matter how many apps and 
+    PDCs use it. 
+
+    Files are keyed by their resolved path, modification time and size, so 
+    an edited file is read and parsed again. Strings with the comment-header 
+    are keyed by a hash of their content.
+
+    Stylesheets can ``@import "file.uiss";`` other stylesheets. Each file is 
+    parsed (and kept in the registry) on its own, so a file imported by 
+    several stylesheets is only parsed once and editing it only parses it 
+    again. The imported files are loaded concurrently. The styles are then 
+    merged in order: the imports, in the order they are declared, followed 
+    by the stylesheet itself, so that later styles override earlier ones. A 
+    file imported more than once is only applied where it is first imported.
+    """
+    def __init__(self):
+        self._stylesheets = {}
+        self._resolved = {} # resolved stylesheets, keyed by the key of the importing stylesheet
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def GetKey(self, file):
+        """ Get the key of the stylesheet file or string. See: ``GetStyleSheetKey`` """
+        return GetStyleSheetKey(file)
+
+    def Lookup(self, file):
+        """ Get the parsed stylesheet if it is already in the registry. Imports are not resolved.
+
+        :param file: path to the stylesheet or string with the comment-header
+        :returns: `StyleSheet` or ``None``
+        """
+        key, path = GetStyleSheetKey(file)
+        with self._lock:
+            return self._stylesheets.get(key)
+
+    def GetStyleSheet(self, file):
+        """ Get the parsed stylesheet with its imports resolved, reading and 
+        parsing any file which is not in the registry yet.
+
+        :param file: path to the stylesheet, string with the comment-header or a `StyleSheet` (e.g: loaded in the background), which is added to the registry
+        :returns: `StyleSheet`, which is the given one if it is already resolved and up to date
+        """
+        return self.ResolveImports(self.GetFragment(file))
+
+    def GetFragment(self, file):
+        """ Get the parsed stylesheet on its own, without resolving its imports.
+
+        :param file: path to the stylesheet, string with the comment-header or a `StyleSheet`, which is added to the registry
+        :returns: `StyleSheet`
+        """
+        if isinstance(file, StyleSheet):
+            return self.Add(file)
+
+        stylesheet = self.Lookup(file)
+        if stylesheet is not None:
+            return stylesheet
+
+        return self.Add(StyleSheet(*ReadStyleSheetData(file)))
+
+    def ResolveImports(self, stylesheet):
+        """ Get the stylesheet with the styles of its imports merged in. 
+
+        :param stylesheet: `StyleSheet` on its own (see ``GetFragment``), or already resolved
+        :returns: `StyleSheet`, which is the given one if it has no imports
+        """
+        stylesheet = stylesheet.GetFragment()
+        if not stylesheet.GetImports():
+            return stylesheet
+
+        fragments = self._LoadImports(stylesheet)
+        order = []
+        self._OrderImports(stylesheet, fragments, order, [stylesheet.GetPath()], set())
+        key = ("imports",) + tuple(fragment.GetKey() for fragment in order)
+
+        root_key = stylesheet.GetKey()
+        with self._lock:
+            resolved = self._resolved.get(root_key)
+        if resolved is not None and resolved.GetKey() == key:
+            return resolved
+
+        resolved = StyleSheet(
+            stylesheet.GetRawStyleSheet(),
+            MergeImportedStyles([fragment.ParsedStyles for fragment in order]),
+            key, 
+            stylesheet.GetPath(), 
+            imports=stylesheet.GetImports(),
+            files=[fragment.GetPath() for fragment in order if fragment.GetPath() is not None],
+            fragment=stylesheet
+            )
+
+        path = stylesheet.GetPath()
+        with self._lock:
+            if path is not None:
+                for old_key in [k for k, s in self._resolved.items() if s.GetPath() == path]:
+                    del self._resolved[old_key]
+            self._resolved[root_key] = resolved
+        return resolved
+
+    def _LoadImports(self, stylesheet):
+        """ Get all of the stylesheets imported by the stylesheet, directly 
+        or not. Each level of imports is loaded concurrently.
+
+        :returns: dict of the stylesheets by their path
+        """
+        fragments = {}
+        if stylesheet.GetPath() is not None:
+            fragments[stylesheet.GetPath()] = stylesheet
+
+        level = stylesheet.GetImports()
+        while level:
+            loaded = []
+            futures = []
+            for path in level:
+                if path in fragments:
+                    continue
+                fragment = self.Lookup(path)
+                if fragment is None:
+                    futures.append((path, self._GetExecutor().submit(self.GetFragment, path)))
+                loaded.append(path)
+                fragments[path] = fragment
+
+            for path, future in futures:
+                fragments[path] = future.result()
+
+            level = [path for loaded_path in loaded 
+                     for path in fragments[loaded_path].GetImports()]
+        return fragments
+
+    def _OrderImports(self, stylesheet, fragments, order, stack, done):
+        """ Put the stylesheets in the order their styles are merged in, 
+        checking for import cycles. 
+        """
+        for path in stylesheet.GetImports():
+            if path in stack:
+                cycle = stack[stack.index(path):] + [path]
+                raise RuntimeError("Import cycle: {}".format(" -> ".join(cycle)))
+            if path in done:
+                continue
+            stack.append(path)
+            self._OrderImports(fragments[path], fragments, order, stack, done)
+            stack.pop()
+        order.append(stylesheet)
+        done.add(stylesheet.GetPath())
+
+    def _GetExecutor(self):
+        # Fragments are only read and parsed in here, so that they never 
+        # wait on each other (or on a background load of the importing 
+        # stylesheet).
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=min(8, os.cpu_count() or 1),
+                    thread_name_prefix="UIStyleLangImport"
+                    )
+            return self._executor
+
+    def Add(self, stylesheet):
+        """ Add the stylesheet to the registry, replacing any older version of the same file. 
+        Only stylesheets on their own are kept, so for a resolved stylesheet, its fragment is added.
+
+        :returns: the `StyleSheet` in the registry, which is the existing one if another thread added it first
+        """
+        stylesheet = stylesheet.GetFragment()
+        key = stylesheet.GetKey()
+        path = stylesheet.GetPath()
+        with self._lock:
+            if key in self._stylesheets:
+                return self._stylesheets[key]
+            if path is not None:
+                for old_key in [k for k, s in self._stylesheets.items() if s.GetPath() == path]:
+                    del self._stylesheets[old_key]
+            self._stylesheets[key] = stylesheet
+        return stylesheet
+
+    def Remove(self, file):
+        """ Remove the stylesheet file or string from the registry. """
+        key, path = self.GetKey(file)
+        with self._lock:
+            for old_key in [k for k, s in self._stylesheets.items() 
+                            if k == key or (path is not None and s.GetPath() == path)]:
+                del self._stylesheets[old_key]
+            for old_key in [k for k, s in self._resolved.items() 
+                            if k == key or (path is not None and path in s.GetFiles())]:
+                del self._resolved[old_key]
+
+    def Clear(self):
+        """ Remove all of the stylesheets from the registry. """
+        with self._lock:
+            self._stylesheets.clear()
+            self._resolved.clear()
+
+
+_registry = StyleSheetRegistry()
+
+
+def GetStyleSheetRegistry():
+    """ Get the ``StyleSheetRegistry`` shared by the whole process. """
+    return _registry
@@ -0,0 +1,405 @@
+# UI Style Lang Copyright 2020-2023 Noah Rahm
+
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+
+#     1. Redistributions of source code must retain the above copyright notice, 
+#        this list of conditions and the following disclaimer.
+    
+#     2. Redistributions in binary form must reproduce the above copyright 
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+
+#     3. The names of Noah Rahm, Correct Syntax and any contributers may not be 
+#        used to endorse or promote products derived from this software without 
+#        specific prior written permission.  
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Caches of wxPython drawing resources shared between elements
+# For consistency with the wxPython methods, title-case is used in this file
+
+import os
+from collections import OrderedDict
+
+import wx
+
+
+class LRUCache(object):
+    """ Cache which keeps the most recently used entries, up to a maximum 
+    total size, and counts its hits, misses and evictions. Each entry has a 
+    size of 1, unless ``_GetSize`` is overridden (e.g: by ``BitmapLRUCache``).
+
+    :param max_size: maximum total size of the entries. The least recently used entries are evicted first.
+    """
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._total_size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _GetSize(self, value):
+        return 1
+
+    def _Get(self, key, factory, *args):
+        try:
+            value = self._entries[key][0]
+        except KeyError:
+            pass
+        else:
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+        self._misses += 1
+        value = factory(*args)
+        size = self._GetSize(value)
+        self._entries[key] = (value, size)
+        self._total_size += size
+        self._Evict(self._max_size)
+        return value
+
+    def _Evict(self, max_size):
+        # Always keep the most recently used entry, even if it 
+        # is larger than the whole budget by itself.
+        while self._total_size > max_size and len(self._entries) > 1:
+            self._Remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _Remove(self, key):
+        value, size = self._entries.pop(key)
+        self._total_size -= size
+
+    def _RemoveIf(self, predicate=None):
+        """ Remove the entries of which the key matches the predicate, or all of them if no predicate is given. """
+        if predicate is None:
+            self._entries.clear()
+            self._total_size = 0
+        else:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._Remove(key)
+
+    def SetMaxSize(self, max_size):
+        """ Set the maximum total size of the entries, evicting the least recently used ones if needed. """
+        self._max_size = max_size
+        self._Evict(max_size)
+
+    def GetStats(self):
+        """ Get the statistics of the cache.
+
+        :returns: dictionary with the ``hits``, ``misses``, ``evictions``, ``size`` and ``max_size`` of the cache
+        """
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "size": len(self._entries),
+            "max_size": self._max_size,
+        }
+
+    def Clear(self):
+        """ Remove all of the entries from the cache and reset the statistics. """
+        self._RemoveIf(None)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+
+class ResourcePool(LRUCache):
+    """ Pool of ``wx.Colour``, ``wx.Pen`` and ``wx.Brush`` objects shared by 
+    all of the elements of a ``UIStylePDC`` so that they are created once 
+    and reused across redraws, instead of being created on every draw.
+
+    :param int max_size: maximum number of resources to keep. The least recently used ones are evicted first.
+    """
+    def __init__(self, max_size=512):
+        LRUCache.__init__(self, max_size)
+
+    def GetColour(self, colour):
+        """ Get the ``wx.Colour`` of the colour string (e.g: ``"red"`` or ``"#C7C729"``). """
+        return self._Get(("colour", colour), wx.Colour, colour)
+
+    def GetPen(self, colour, width):
+        """ Get a ``wx.Pen`` of the colour string and width. """
+        return self._Get(("pen", colour, width), self._CreatePen, colour, width)
+
+    def GetBrush(self, colour, style=wx.SOLID):
+        """ Get a ``wx.Brush`` of the colour string and brush style. """
+        return self._Get(("brush", colour, style), self._CreateBrush, colour, style)
+
+    def _CreatePen(self, colour, width):
+        return wx.Pen(self.GetColour(colour), width)
+
+    def _CreateBrush(self, colour, style):
+        return wx.Brush(self.GetColour(colour), style)
+
+
+class BitmapLRUCache(LRUCache):
+    """ ``LRUCache`` of ``wx.Bitmap`` objects, bounded by their total size 
+    in bytes (4 bytes per pixel).
+
+    :param int max_bytes: maximum total size of the bitmaps in bytes
+    """
+    def _GetSize(self, bitmap):
+        return bitmap.GetWidth() * bitmap.GetHeight() * 4
+
+    def SetMaxBytes(self, max_bytes):
+        """ Set the maximum total size of the cached bitmaps, evicting the least recently used ones if needed. """
+        self.SetMaxSize(max_bytes)
+
+    def GetStats(self):
+        """ Get the statistics of the cache.
+
+        :returns: dictionary with the ``hits``, ``misses``, ``evictions``, ``size``, ``bytes`` and ``max_bytes`` of the cache
+        """
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "size": len(self._entries),
+            "bytes": self._total_size,
+            "max_bytes": self._max_size,
+        }
+
+
+class BitmapCache(BitmapLRUCache):
+    """ Cache of decoded (and rotated) ``wx.Bitmap`` objects for image 
+    elements, keyed by the image path, the modification time of the file 
+    and the rotation. 
+    
+    The modification time of a path is only read the first time the path 
+    is used, so redrawing an image that is already cached doesn't touch the 
+    disk at all. Use ``Invalidate`` or ``InvalidateStale`` when image files 
+    change on disk.
+
+    :param int max_bytes: maximum total size of the cached bitmaps in bytes (4 bytes per pixel). The least recently used bitmaps are evicted first.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        BitmapLRUCache.__init__(self, max_bytes)
+        self._mtimes = {}
+
+    def _GetMTime(self, path):
+        try:
+            return self._mtimes[path]
+        except KeyError:
+            pass
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        self._mtimes[path] = mtime
+        return mtime
+
+    def GetBitmap(self, path, rotation=0, rotation_center=wx.DefaultPosition):
+        """ Get the bitmap of the image file, rotated by ``rotation``. 
+        
+        :param str path: path to the image file
+        :param rotation: rotation of the image, as passed to ``wx.Image.Rotate``. Zero for no rotation.
+        :param rotation_center: ``wx.Point`` to rotate around when the bitmap needs to be created
+        :returns: `wx.Bitmap`
+        """
+        key = (path, self._GetMTime(path), rotation)
+        return self._Get(key, self._LoadBitmap, path, rotation, rotation_center)
+
+    def _LoadBitmap(self, path, rotation, rotation_center):
+        image = wx.Image(path)
+        if rotation != 0:
+            image = wx.Image.Rotate(image, rotation, rotation_center)
+        return wx.Image.ConvertToBitmap(image)
+
+    def Invalidate(self, path=None):
+        """ Remove the cached bitmaps of the image path, or all of them if no path is given. 
+        The modification time of the path is read again the next time it is used.
+        """
+        if path is None:
+            self._RemoveIf(None)
+            self._mtimes.clear()
+        else:
+            self._RemoveIf(lambda key: key[0] == path)
+            self._mtimes.pop(path, None)
+
+    def InvalidateStale(self):
+        """ Check the modification times of the cached image paths and remove the bitmaps of files that changed. 
+
+        :returns: list of the paths that changed
+        """
+        changed = []
+        for path, mtime in list(self._mtimes.items()):
+            try:
+                new_mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                new_mtime = None
+            if new_mtime != mtime:
+                self.Invalidate(path)
+                changed.append(path)
+        return changed
+
+    def Clear(self):
+        """ Remove all of the bitmaps from the cache and reset the statistics. """
+        BitmapLRUCache.Clear(self)
+        self._mtimes.clear()
+
+
+class FontCache(LRUCache):
+    """ Cache of the fonts of the text elements, derived from the font of 
+    the parent window, keyed by the font-size, font-weight, font-style and 
+    text-decoration. Each derived ``wx.Font`` is only created once, rather 
+    than on every draw. 
+    
+    The cache is cleared when the base font changes. See: ``SetBaseFont``
+
+    :param int max_size: maximum number of fonts to keep. The least recently used ones are evicted first.
+    """
+    def __init__(self, max_size=64):
+        LRUCache.__init__(self, max_size)
+        self._base_font = None
+        self._base_key = None
+
+    def SetBaseFont(self, font, force=False):
+        """ Set the font the fonts are derived from (e.g: the font of the parent window).
+
+        :param font: `wx.Font`
+        :param bool force: clear the cache even if the font is the same (e.g: when the DPI changed)
+        :returns: whether the cache was cleared
+        """
+        base_key = font.GetNativeFontInfoDesc()
+        if self._base_font is not None and base_key == self._base_key and not force:
+            return False
+
+        self._base_font = font
+        self._base_key = base_key
+        self._RemoveIf(None)
+        return True
+
+    def GetBaseFont(self):
+        return self._base_font
+
+    def GetFontKey(self, font_size=0, font_weight=None, font_style=None, underline=False):
+        """ Get the key identifying the derived font. See: ``GetFont`` """
+        return (self._base_key, font_size, font_weight, font_style, underline)
+
+    def GetFont(self, font_size=0, font_weight=None, font_style=None, underline=False):
+        """ Get the font derived from the base font.
+
+        :param int font_size: smaller than the base font if negative, larger if positive
+        :param font_weight: ``wx.FontWeight`` or ``None`` to keep the weight of the base font
+        :param font_style: ``wx.FontStyle`` or ``None`` to keep the style of the base font
+        :param bool underline: whether the font is underlined
+        :returns: `wx.Font`
+        """
+        key = self.GetFontKey(font_size, font_weight, font_style, underline)
+        return self._Get(key, self._CreateFont, font_size, font_weight, font_style, underline)
+
+    def _CreateFont(self, font_size, font_weight, font_style, underline):
+        font = wx.Font(self._base_font)
+
+        # Text decoration
+        if underline:
+            font.MakeUnderlined()
+
+        # Font size
+        if font_size < 0:
+            font.MakeSmaller()
+
+        elif font_size > 0:
+            font.MakeLarger()
+
+        # Font weight
+        if font_weight is not None:
+            font.SetWeight(font_weight)
+
+        # Font style
+        if font_style is not None:
+            font.SetStyle(font_style)
+
+        return font
+
+    def Clear(self):
+        """ Remove all of the fonts (and the base font) from the cache and reset the statistics. """
+        LRUCache.Clear(self)
+        self._base_font = None
+        self._base_key = None
+
+
+class TextExtentCache(LRUCache):
+    """ Cache of the measured sizes of the text of the text elements, 
+    keyed by the font key (see: ``FontCache.GetFontKey``) and the text, 
+    since measuring large labels with ``GetFullTextExtent`` is expensive.
+
+    :param int max_size: maximum number of measurements to keep. The least recently used ones are evicted first.
+    """
+    def __init__(self, max_size=4096):
+        LRUCache.__init__(self, max_size)
+
+    def GetTextExtent(self, window, font_key, font, text):
+        """ Get the size of the text drawn in the font.
+
+        :param window: `wx.Window` to measure the text with
+        :param font_key: key of the font, from ``FontCache.GetFontKey``
+        :param font: `wx.Font`
+        :param str text: the text (after the text-transform), which may have several lines
+        :returns: ``(width, height)`` tuple of the bounds of all of the lines
+        """
+        return self._Get((font_key, text), self._MeasureText, window, font, text)
+
+    def _MeasureText(self, window, font, text):
+        if "\n" not in text:
+            return tuple(window.GetFullTextExtent(text, font)[:2])
+
+        # DrawText draws each line below the previous one. As with 
+        # GetMultiLineTextExtent, empty lines are as high as a "W".
+        width = 0
+        height = 0
+        for line in text.split("\n"):
+            line_width, line_height = window.GetFullTextExtent(line or "W", font)[:2]
+            if line:
+                width = max(width, line_width)
+            height += line_height
+        return width, height
+
+
+class LayerCache(BitmapLRUCache):
+    """ Cache of the offscreen bitmaps of the elements drawn in retained 
+    mode (see: ``UIStylePDC.SetCacheHint``), shared by all of the 
+    ``UIStylePDC`` objects of the process so that they are kept under one 
+    memory budget.
+
+    :param int max_bytes: maximum total size of the cached bitmaps in bytes (4 bytes per pixel). The least recently used bitmaps are evicted first.
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        BitmapLRUCache.__init__(self, max_bytes)
+
+    def GetLayer(self, key, factory, *args):
+        """ Get the bitmap of the key, rendering it with ``factory(*args)`` if it isn't cached.
+
+        :param key: tuple, of which the first item is the namespace of the owner (see: ``Invalidate``)
+        :returns: `wx.Bitmap`
+        """
+        return self._Get(key, factory, *args)
+
+    def Invalidate(self, namespace=None):
+        """ Remove the cached bitmaps of the namespace, or all of them if no namespace is given. """
+        if namespace is None:
+            self._RemoveIf(None)
+        else:
+            self._RemoveIf(lambda key: key[0] == namespace)
+
+
+_layer_cache = LayerCache()
+
+
+def GetLayerCache():
+    """ Get the ``LayerCache`` shared by the whole process. """
+    return _layer_cache
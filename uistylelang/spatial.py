@@ -0,0 +1,129 @@
+# UI Style Lang Copyright 2020-2023 Noah Rahm
+
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+
+#     1. Redistributions of source code must retain the above copyright notice, 
+#        this list of conditions and the following disclaimer.
+    
+#     2. Redistributions in binary form must reproduce the above copyright 
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+
+#     3. The names of Noah Rahm, Correct Syntax and any contributers may not be 
+#        used to endorse or promote products derived from this software without 
+#        specific prior written permission.  
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Spatial index used for hit-testing elements
+# For consistency with the wxPython methods, title-case is used in this file
+
+
+class SpatialGrid(object):
+    """ Uniform grid over the rects of the items, so that hit-testing only 
+    looks at the items in the cells around the point instead of at all of 
+    them. Rects are given as ``(x, y, width, height)`` (``wx.Rect`` works too).
+
+    Each item also has an order (e.g: the order it is drawn in) and query 
+    results are returned topmost (highest order) first.
+
+    :param int cell_size: width and height of a grid cell in pixels
+    """
+    def __init__(self, cell_size=64):
+        self._cell_size = cell_size
+        self._cells = {}
+        self._items = {} # key: (x, y, width, height, order, cells)
+
+    def _GetCells(self, x, y, width, height):
+        size = self._cell_size
+        x1 = int(x // size)
+        y1 = int(y // size)
+        x2 = int((x + width - 1) // size)
+        y2 = int((y + height - 1) // size)
+        return [(cx, cy) for cx in range(x1, x2 + 1) for cy in range(y1, y2 + 1)]
+
+    def Insert(self, key, rect, order):
+        """ Add the item, or move it if it is already in the grid. Items with an empty rect are not hit by anything. """
+        x, y, width, height = rect[0], rect[1], rect[2], rect[3]
+
+        if key in self._items:
+            item = self._items[key]
+            if item[:5] == (x, y, width, height, order):
+                return
+            self.Remove(key)
+
+        if width <= 0 or height <= 0:
+            cells = []
+        else:
+            cells = self._GetCells(x, y, width, height)
+
+        for cell in cells:
+            try:
+                self._cells[cell].add(key)
+            except KeyError:
+                self._cells[cell] = {key}
+
+        self._items[key] = (x, y, width, height, order, cells)
+
+    def Remove(self, key):
+        """ Remove the item from the grid, if it is in it. """
+        item = self._items.pop(key, None)
+        if item is None:
+            return
+
+        for cell in item[5]:
+            keys = self._cells[cell]
+            keys.discard(key)
+            if not keys:
+                del self._cells[cell]
+
+    def Clear(self):
+        """ Remove all of the items from the grid. """
+        self._cells.clear()
+        self._items.clear()
+
+    def _Sorted(self, keys):
+        items = self._items
+        return sorted(keys, key=lambda key: items[key][4], reverse=True)
+
+    def QueryPoint(self, x, y):
+        """ Get the keys of the items whose rect contains the point, topmost first. """
+        size = self._cell_size
+        keys = self._cells.get((int(x // size), int(y // size)), ())
+
+        hits = []
+        for key in keys:
+            ix, iy, width, height = self._items[key][:4]
+            if ix <= x < ix + width and iy <= y < iy + height:
+                hits.append(key)
+        return self._Sorted(hits)
+
+    def QueryRect(self, rect):
+        """ Get the keys of the items whose rect intersects the rect, topmost first. """
+        x, y, width, height = rect[0], rect[1], rect[2], rect[3]
+        if width <= 0 or height <= 0:
+            return []
+
+        candidates = set()
+        for cell in self._GetCells(x, y, width, height):
+            keys = self._cells.get(cell)
+            if keys:
+                candidates.update(keys)
+
+        hits = []
+        for key in candidates:
+            ix, iy, iwidth, iheight = self._items[key][:4]
+            if ix < x + width and x < ix + iwidth and iy < y + height and y < iy + iheight:
+                hits.append(key)
+        return self._Sorted(hits)
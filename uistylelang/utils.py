@@ -28,7 +28,26 @@
 # Utility functions
 # For consistency with the wxPython methods, title-case is used in this file
 
+import contextlib
 import copy
+import mmap
+import os
+
+
+INVALID_FILE_MESSAGE = """Invalid file type or string formatting!
+        Possible solutions:
+        1. Only .uiss and .css filetype extensions are supported.
+        2. String must start with the /* !uistylelangstr */ comment-header. """
+
+
+def IsStyleSheetString(raw_file):
+    """ Whether ``raw_file`` is a stylesheet string with the comment-header 
+    rather than the path of a stylesheet file. See: ``ReadRawFile``
+    """
+    # Whether there is a line break before the 
+    # header or not we accept it.
+    return (raw_file.startswith("/* !uistylelangstr */") 
+            or raw_file.startswith("\n/* !uistylelangstr */"))
 
 
 def ReadRawFile(raw_file):
@@ -47,12 +66,7 @@ def ReadRawFile(raw_file):
 
     Supports .CSS and .UISS stylesheets
     """ 
-    # Whether there is a line break before the 
-    # header or not we accept it.
-    if raw_file.startswith("/* !uistylelangstr */"): 
-        return raw_file
-    
-    elif raw_file.startswith("\n/* !uistylelangstr */"):
+    if IsStyleSheetString(raw_file): 
         return raw_file
 
     # Only accept .css or .uiss files
@@ -61,11 +75,33 @@ def ReadRawFile(raw_file):
         return raw_text
 
     else:
-        msg = """Invalid file type or string formatting!
-        Possible solutions:
-        1. Only .uiss and .css filetype extensions are supported.
-        2. String must start with the /* !uistylelangstr */ comment-header. """
-        raise Exception(msg)
+        raise Exception(INVALID_FILE_MESSAGE)
+
+
+@contextlib.contextmanager
+def MapRawFile(raw_file):
+    """ Memory-maps the stylesheet file (read-only) for as long as the 
+    ``with`` block runs, rather than reading and decoding it like 
+    ``ReadRawFile``. The bytes can be parsed with ``UIStyleLangParser.parse_bytes``.
+
+    Example:
+
+        with MapRawFile("styles.uiss") as uiss_bytes:
+            parsed_styles = parser.parse_bytes(uiss_bytes)
+
+    Supports .CSS and .UISS stylesheets
+    """
+    if not (raw_file.endswith(".css") or raw_file.endswith(".uiss")):
+        raise Exception(INVALID_FILE_MESSAGE)
+
+    with open(raw_file, "rb") as stylesheet_file:
+        # Empty files can't be mapped
+        if os.fstat(stylesheet_file.fileno()).st_size == 0:
+            yield b""
+            return
+
+        with mmap.mmap(stylesheet_file.fileno(), 0, access=mmap.ACCESS_READ) as uiss_bytes:
+            yield uiss_bytes
 
 
 def MergeParsedStyles(_id, styles, current_styles):
@@ -0,0 +1,266 @@
+# UI Style Lang Copyright 2020-2023 Noah Rahm
+
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+
+#     1. Redistributions of source code must retain the above copyright notice, 
+#        this list of conditions and the following disclaimer.
+    
+#     2. Redistributions in binary form must reproduce the above copyright 
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+
+#     3. The names of Noah Rahm, Correct Syntax and any contributers may not be 
+#        used to endorse or promote products derived from this software without 
+#        specific prior written permission.  
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Hot reload of stylesheet files
+# For consistency with the wxPython methods, title-case is used in this file
+
+# The watcher runs in a background thread. It polls the modification time
+# and size of the file (or waits for inotify events of its directory when
+# the optional ``inotify_simple`` package is installed), waits for a burst
+# of saves to settle, then reads and re-parses the file incrementally in
+# that thread. Only the result is handed to the UI thread (e.g: with
+# ``wx.CallAfter``), along with the set of (id, pseudo-id) blocks which
+# changed, so that only those have to be restyled.
+
+import os
+import threading
+import time
+
+from .lang import UIStyleLangParser, diff_parsed_data
+from .registry import StyleSheet, GetStyleSheetRegistry, ReloadStyleSheetData
+from .utils import IsStyleSheetString
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+class StyleSheetWatcher(object):
+    """ Watches a stylesheet file, and the stylesheets it imports, and re-parses it when one of them is saved.
+
+    :param str file: path to the stylesheet file
+    :param callback: called with the new ``StyleSheet`` and the set of ``(id, pseudo_id)`` blocks which were added, removed or changed
+    :param dispatch: called with the callback and its arguments to run it on the UI thread (e.g: ``wx.CallAfter``). Defaults to calling it from the watcher thread.
+    :param float interval: seconds between polls of the file
+    :param float debounce: seconds the file must stay unchanged before it is reloaded, so that a burst of saves is only reloaded once
+    :param stylesheet: the current ``StyleSheet`` of the file. Defaults to the one in the registry.
+    """
+    def __init__(self, file, callback, dispatch=None, interval=0.25, debounce=0.1, stylesheet=None):
+        if IsStyleSheetString(file):
+            raise RuntimeError("Only stylesheet files can be watched, not strings!")
+
+        self._path = os.path.realpath(file)
+        self._callback = callback
+        self._dispatch = dispatch
+        self._interval = interval
+        self._debounce = debounce
+
+        if stylesheet is None:
+            stylesheet = GetStyleSheetRegistry().GetStyleSheet(self._path)
+        self._stylesheet = stylesheet
+
+        # Keeps the block index of the last version of the file
+        self._lang_parser = UIStyleLangParser(stylesheet.GetRawStyleSheet())
+
+        self._signature = self.GetSignature()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "reloads": 0,
+            "changed": 0, # (id, pseudo_id) blocks changed by the last reload
+            "parse_time": 0.0, # seconds to read and parse the file
+            "apply_time": 0.0, # seconds the callback took
+            "total_time": 0.0, # seconds from noticing the change to applying it, including the debounce
+            "error": None, # error of the last reload, if it failed
+            }
+
+    def GetPath(self):
+        return self._path
+
+    def GetStyleSheet(self):
+        return self._stylesheet
+
+    def GetInterval(self):
+        return self._interval
+
+    def GetDebounce(self):
+        return self._debounce
+
+    def GetFiles(self):
+        """ Get the paths of the watched files: the stylesheet and the stylesheets it imports. """
+        return self._stylesheet.GetFiles() or (self._path,)
+
+    def GetSignature(self):
+        """ Get the modification time and size of each watched file, which is ``None`` for a file that doesn't exist (e.g: while an editor replaces it). """
+        signature = []
+        for path in self.GetFiles():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def GetStats(self):
+        """ Get the timings of the last reload.
+
+        :returns: dict with the ``reloads`` count, the number of blocks ``changed``, the ``parse_time``, ``apply_time`` and ``total_time`` in seconds and the last ``error``
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def Start(self):
+        """ Start watching the file in a background thread. """
+        if self.IsRunning():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._Run, name="UIStyleLangWatcher", daemon=True
+            )
+        self._thread.start()
+
+    def Stop(self):
+        """ Stop watching the file. """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def IsRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def IsUsingInotify(self):
+        """ Whether file events are used rather than polling. """
+        return inotify_simple is not None
+
+    def _Run(self):
+        if inotify_simple is not None:
+            try:
+                self._RunInotify()
+                return
+            except OSError:
+                # e.g: out of inotify watches
+                pass
+        self._RunPolling()
+
+    def _RunPolling(self):
+        while not self._stop_event.wait(self._interval):
+            if self.GetSignature() != self._signature:
+                self._WaitForSettle()
+
+    def _RunInotify(self):
+        flags = inotify_simple.flags
+        watched_dirs = set()
+        with inotify_simple.INotify() as inotify:
+            while not self._stop_event.is_set():
+                # Watch the directories, since editors often replace the files.
+                # The imports can change with each reload.
+                names = set()
+                for path in self.GetFiles():
+                    dir_path, name = os.path.split(path)
+                    names.add(name)
+                    if dir_path not in watched_dirs:
+                        inotify.add_watch(
+                            dir_path, 
+                            flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+                            )
+                        watched_dirs.add(dir_path)
+
+                events = inotify.read(timeout=int(self._interval * 1000))
+                if (any(event.name in names for event in events) 
+                        and self.GetSignature() != self._signature):
+                    self._WaitForSettle()
+
+    def _WaitForSettle(self):
+        """ Wait until the file stays unchanged for the debounce time, then reload it. """
+        noticed = time.perf_counter()
+        signature = self.GetSignature()
+        while not self._stop_event.wait(self._debounce):
+            new_signature = self.GetSignature()
+            if new_signature == signature and None not in new_signature:
+                self.Reload(noticed)
+                return
+            signature = new_signature
+
+    def Reload(self, noticed=None):
+        """ Read and re-parse the file, then pass the changes to the callback. 
+        Called from the watcher thread, but it can also be called directly to 
+        reload the file right away.
+
+        :returns: the set of ``(id, pseudo_id)`` blocks which changed, or ``None`` if the file couldn't be reloaded
+        """
+        start = time.perf_counter()
+        if noticed is None:
+            noticed = start
+
+        registry = GetStyleSheetRegistry()
+        self._signature = self.GetSignature()
+
+        try:
+            data, changed = ReloadStyleSheetData(self._path, self._lang_parser)
+        except Exception as error:
+            # Keep the last good version, e.g: while the file is half-written. 
+            # The error is reported by GetStats.
+            with self._lock:
+                self._stats["error"] = error
+            return None
+
+        fragment = registry.Add(StyleSheet(*data))
+
+        old_stylesheet = self._stylesheet
+        try:
+            stylesheet = registry.ResolveImports(fragment)
+        except Exception as error:
+            with self._lock:
+                self._stats["error"] = error
+            return None
+
+        if stylesheet.GetImports() or old_stylesheet.GetImports():
+            # The imported styles could have changed too
+            changed = diff_parsed_data(old_stylesheet.ParsedStyles, stylesheet.ParsedStyles)
+
+        self._stylesheet = stylesheet
+        if stylesheet.GetFiles() != old_stylesheet.GetFiles():
+            self._signature = self.GetSignature()
+        parse_time = time.perf_counter() - start
+
+        with self._lock:
+            self._stats["reloads"] += 1
+            self._stats["changed"] = len(changed)
+            self._stats["parse_time"] = parse_time
+            self._stats["error"] = None
+
+        if changed:
+            if self._dispatch is None:
+                self._Apply(stylesheet, changed, noticed)
+            else:
+                self._dispatch(self._Apply, stylesheet, changed, noticed)
+        return changed
+
+    def _Apply(self, stylesheet, changed, noticed):
+        start = time.perf_counter()
+        self._callback(stylesheet, changed)
+        end = time.perf_counter()
+
+        with self._lock:
+            self._stats["apply_time"] = end - start
+            self._stats["total_time"] = end - noticed
@@ -32,29 +32,174 @@
 import wx
 
 from .lang import UIStyleLangParser
-from .utils import ReadRawFile, MergeParsedStyles
+from .registry import StyleSheet, GetStyleSheetRegistry
+from .utils import MergeParsedStyles
+from .watcher import StyleSheetWatcher
 
 
 class UIStyleApp(wx.App):
     """ Wrapper of ``wx.App`` 
     
-    :param file: path to stylesheet for the Native Widget API styling
+    :param file: path to stylesheet for the Native Widget API styling, or a `StyleSheet` (e.g: from ``LoadStyleSheetFuture``)
 
     Please refer to the wxPython docs for the rest of the params.
     """
     def __init__(self, file, redirect=False, filename=None, useBestVisual=False, clearSigInt=True):
         wx.App.__init__(self, redirect, filename, useBestVisual, clearSigInt)
 
-        self.raw_stylesheet = ReadRawFile(file)
-        self.lang_parser = UIStyleLangParser(self.GetRawStyleSheet())
+        self._watcher = None
+        self.SetStyleSheet(file)
         
     def GetRawStyleSheet(self):
         return self.raw_stylesheet
+
+    def SetStyleSheet(self, file):
+        """ Replace the stylesheet of the app. The styles of the widgets are not 
+        changed until ``ApplyStylesheet`` (or their ``ConfigureStyle`` method) is called.
+
+        :param file: path to the stylesheet, string with the comment-header or a `StyleSheet` (e.g: from ``LoadStyleSheetFuture``)
+        """
+        if isinstance(file, StyleSheet):
+            file = GetStyleSheetRegistry().GetStyleSheet(file).GetSource()
+        self.stylesheet_file = file
+        self._LoadStyleSheet()
+
+        if self._watcher is not None:
+            # Watch the new file with the same options and callback
+            interval = self._watcher.GetInterval()
+            debounce = self._watcher.GetDebounce()
+            callback = self._watcher_callback
+            self.UnwatchStyleSheet()
+            self.WatchStyleSheet(interval, debounce, callback)
+
+    def ReloadStyleSheet(self):
+        """ Read and parse the stylesheet file again if it was edited. """
+        self._LoadStyleSheet()
+
+    def InvalidateParsedStyles(self):
+        """ Clear the parsed styles, so that the stylesheet is looked up in the 
+        registry again (and parsed again if the file changed) the next time 
+        ``ParsedStyles`` is used. 
+        """
+        self._parsed_styles = None
+
+    def _LoadStyleSheet(self):
+        # The stylesheet is read and parsed once per process
+        self.stylesheet = GetStyleSheetRegistry().GetStyleSheet(self.stylesheet_file)
+        self.raw_stylesheet = self.stylesheet.GetRawStyleSheet()
+        self.lang_parser = UIStyleLangParser(self.GetRawStyleSheet())
+        self._parsed_styles = self.stylesheet.ParsedStyles
+
+    def GetStyleSheet(self):
+        """ Get the shared, read-only ``StyleSheet`` of the app. """
+        return self.stylesheet
+
+    def WatchStyleSheet(self, interval=0.25, debounce=0.1, callback=None):
+        """ Reload the stylesheet file whenever it is saved. The file is 
+        re-parsed in a background thread, then (on the UI thread) only the 
+        widgets with a changed id are restyled. See: ``ApplyStylesheet``
+
+        :param float interval: seconds between checks of the file
+        :param float debounce: seconds the file must stay unchanged before it is reloaded
+        :param callback: called with the set of changed ``(id, pseudo_id)`` blocks after the widgets are restyled
+        :returns: `StyleSheetWatcher`
+        """
+        if self._watcher is not None:
+            self.UnwatchStyleSheet()
+        self._watcher_callback = callback
+        self._watcher = StyleSheetWatcher(
+            self.stylesheet_file, self._OnStyleSheetChanged, wx.CallAfter, 
+            interval, debounce, self.stylesheet
+            )
+        self._watcher.Start()
+        return self._watcher
+
+    def UnwatchStyleSheet(self):
+        """ Stop reloading the stylesheet file when it is saved. """
+        if self._watcher is not None:
+            self._watcher.Stop()
+            self._watcher = None
+
+    def GetReloadStats(self):
+        """ Get the timings of the last reload of the watched stylesheet. See: ``StyleSheetWatcher.GetStats`` """
+        if self._watcher is None:
+            return None
+        return self._watcher.GetStats()
+
+    def _OnStyleSheetChanged(self, stylesheet, changed):
+        self.stylesheet = stylesheet
+        self.raw_stylesheet = stylesheet.GetRawStyleSheet()
+        self.lang_parser = UIStyleLangParser(self.GetRawStyleSheet())
+        self._parsed_styles = stylesheet.ParsedStyles
+
+        self.ApplyStylesheet(names=set(elem_id for elem_id, pseudo_id in changed))
+
+        if self._watcher_callback is not None:
+            self._watcher_callback(changed)
+
+    def GetWidgetIndex(self, top_window):
+        """ Walk the window tree once and index the styled widgets by their name (id in the stylesheet).
+
+        :param top_window: the window to start from, which is included
+        :returns: dict of the lists of widgets with each name
+        """
+        index = {}
+        windows = [top_window]
+        while windows:
+            window = windows.pop()
+            windows.extend(window.GetChildren())
+
+            if hasattr(window, "ConfigureStyle"):
+                index.setdefault(window.GetName(), []).append(window)
+        return index
+
+    def ApplyStylesheet(self, top_window=None, names=None):
+        """ Restyle the styled widgets of the window and its children from the 
+        current stylesheet. The styles are set while the window is frozen, so 
+        that the whole window is repainted once, rather than once per widget.
+        Widgets whose name is not declared in the stylesheet are left as they are.
+
+        :param top_window: the window to restyle. Defaults to all of the top-level windows.
+        :param names: set of the widget names (ids in the stylesheet) to restyle. Defaults to all of them.
+        :returns: the number of widgets restyled
+        """
+        if top_window is None:
+            return sum(
+                self.ApplyStylesheet(window, names) for window in wx.GetTopLevelWindows()
+                )
+
+        parsed_styles = self.ParsedStyles
+        index = self.GetWidgetIndex(top_window)
+        if names is None:
+            names = index.keys()
+
+        count = 0
+        top_window.Freeze()
+        try:
+            for name in names:
+                if name not in parsed_styles:
+                    continue
+                for widget in index.get(name, ()):
+                    try:
+                        widget.ConfigureStyle()
+                    except Exception as error:
+                        print(error)
+                    count += 1
+        finally:
+            top_window.Thaw()
+
+        if count > 0:
+            top_window.Refresh()
+        return count
     
     @property
     def ParsedStyles(self):
-        styles = self.lang_parser.parse()
-        return styles
+        """ The parsed stylesheet. It is shared by all of the widgets (and 
+        any ``UIStylePDC`` using the same stylesheet) and is read-only. 
+        """
+        if self._parsed_styles is None:
+            self._LoadStyleSheet()
+        return self._parsed_styles
 
 
 class UIStyleFrame(wx.Frame):